@@ -4,6 +4,8 @@ import plotly.express as px
 import pandas as pd
 from datetime import datetime, timedelta
 from trading_system import TradingSystem
+from agents.metrics import agent_metrics
+from agents.response_cache import default_cache
 import time
 
 # Page configuration
@@ -20,6 +22,9 @@ if 'trading_system' not in st.session_state:
 if 'last_update' not in st.session_state:
     st.session_state.last_update = None
 
+if 'last_market_poll' not in st.session_state:
+    st.session_state.last_market_poll = None
+
 # Sidebar
 st.sidebar.title("Trading Controls")
 
@@ -27,6 +32,7 @@ st.sidebar.title("Trading Controls")
 with st.sidebar.expander("System Controls", expanded=False):
     if st.button("Reset Trading System"):
         if st.session_state.trading_system.reset_system():
+            st.session_state.trading_system.close()
             st.session_state.trading_system = TradingSystem(initial_balance_usd=100.0, auto_buy_btc=True)
             st.rerun()
     if st.button("Export Market CSV"):
@@ -128,7 +134,8 @@ Autonomous Trading Rules:
 - Executes within 1% of recommended price
 - 0.1% trading fees applied
 - Realistic slippage simulation
-- Analysis every {} minutes
+- Symbols re-analyzed when RSI/MACD/price change materially
+- Every symbol re-analyzed at least every {} minutes
 """.format(trade_interval))
 
 # Main dashboard
@@ -330,6 +337,37 @@ if wallet_summary['positions']:
 else:
     st.info("No open positions")
 
+# Stream agent analyses into expanders as tokens arrive
+def show_streaming_analysis(symbol=None, market_data=None):
+    placeholders = {}
+    texts = {}
+    analysis = None
+    for agent, payload in st.session_state.trading_system.stream_market_analysis(symbol, market_data=market_data):
+        if agent is None:
+            analysis = payload
+            break
+        if agent not in placeholders:
+            placeholders[agent] = st.expander(agent, expanded=True).empty()
+            texts[agent] = ""
+        texts[agent] += payload
+        placeholders[agent].markdown(texts[agent] + " ▌")
+    
+    # Replace partial text with the final aggregated sections (and show any that did not stream)
+    if isinstance(analysis, dict):
+        for agent, agent_analysis in analysis.items():
+            if agent in placeholders:
+                placeholders[agent].write(agent_analysis)
+            else:
+                with st.expander(agent, expanded=True):
+                    st.write(agent_analysis)
+        # Per-shard sections are merged in the result; finalize their streamed text as is
+        for agent, placeholder in placeholders.items():
+            if agent not in analysis:
+                placeholder.markdown(texts[agent])
+    else:
+        st.error(str(analysis))
+    return analysis
+
 # Market Analysis
 st.header("Market Analysis")
 analysis_type = st.radio(
@@ -338,23 +376,32 @@ analysis_type = st.radio(
     horizontal=True
 )
 
-if st.button("Analyze Market") or (auto_trade and (st.session_state.last_update is None or 
-    time.time() - st.session_state.last_update > trade_interval * 60)):
+# Autonomous analysis is change-triggered (see below); this runs a full manual analysis
+if st.button("Analyze Market"):
     
-    with st.spinner("Analyzing market..."):
-        if analysis_type == "Single Pair":
-            analysis = st.session_state.trading_system.analyze_market(symbol)
-        else:
-            analysis = st.session_state.trading_system.analyze_market()
-        st.session_state.last_update = time.time()
-        
-        # Display analysis from each agent in expandable sections
-        if isinstance(analysis, dict):
-            for agent, agent_analysis in analysis.items():
-                with st.expander(agent, expanded=True):
-                    st.write(agent_analysis)
-        else:
-            st.error(str(analysis))
+    # Agent output streams into its expander as tokens arrive
+    if analysis_type == "Single Pair":
+        analysis = show_streaming_analysis(symbol)
+    else:
+        analysis = show_streaming_analysis()
+    st.session_state.last_update = time.time()
+
+# Agent Performance
+st.header("Agent Performance")
+agent_stats = agent_metrics.snapshot()
+if agent_stats:
+    perf_df = pd.DataFrame.from_dict(agent_stats, orient='index')
+    perf_df = perf_df.sort_values('wall_p90', ascending=False, na_position='last')
+    st.dataframe(perf_df)
+    
+    cache_stats = default_cache.stats()
+    st.caption(
+        f"Response cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits, "
+        f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate), "
+        f"{cache_stats['coalesced']} coalesced waits"
+    )
+else:
+    st.info("No LLM calls recorded yet")
 
 # Market Data Visualization
 st.header("Market Data Visualization")
@@ -417,24 +464,23 @@ else:
 # Autonomous Trading Execution
 if auto_trade:
     current_time = time.time()
-    if (st.session_state.last_update is None or 
-        current_time - st.session_state.last_update > trade_interval * 60):
+    if (st.session_state.last_market_poll is None or 
+        current_time - st.session_state.last_market_poll > 60):
+        st.session_state.last_market_poll = current_time
         
-        with st.spinner("Analyzing market and executing trades..."):
-            # Always analyze all pairs in autonomous mode
-            analysis = st.session_state.trading_system.analyze_market()
+        # Only symbols whose indicators changed (or whose heartbeat is due) go to the agents;
+        # the analysis interval acts as the heartbeat floor
+        st.session_state.trading_system.change_detector.heartbeat_s = trade_interval * 60
+        changed_data, changes = st.session_state.trading_system.poll_market_changes()
+        if changes:
+            st.caption("Analyzing changed symbols: " + ", ".join(
+                f"{sym} ({'; '.join(reasons)})" for sym, reasons in changes.items()))
+            # Streaming each agent's output
+            analysis = show_streaming_analysis(market_data=changed_data)
             st.session_state.last_update = current_time
-            
-            # Display analysis from each agent in expandable sections
-            if isinstance(analysis, dict):
-                for agent, agent_analysis in analysis.items():
-                    with st.expander(agent, expanded=True):
-                        st.write(agent_analysis)
-            else:
-                st.error(str(analysis))
-            
-            # Run scalping position manager after analysis
-            st.session_state.trading_system.manage_open_positions()
+        
+        # Run scalping position manager after each market poll
+        st.session_state.trading_system.manage_open_positions()
     
     # Schedule next update
     time.sleep(1)
@@ -11,5 +11,4 @@ from .specialized_agents import (
     ConsensusAdvisorAgent,
     MarketOrchestrator,
 )
-
-
+from .market_context import MarketContext
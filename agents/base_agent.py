@@ -1,9 +1,13 @@
 import os
+import time
 from typing import Optional
-from mistralai import Mistral
 from langchain.schema import SystemMessage
 import dotenv
 dotenv.load_dotenv()
+from .response_cache import default_cache  # reads LLM_CACHE_* settings, so load .env first
+from .llm_pool import get_llm_client, llm_limiter
+from .prompt_encoding import estimate_tokens
+from .metrics import agent_metrics
 
 class BaseAgent:
     """
@@ -11,29 +15,169 @@ class BaseAgent:
     Provides a connection to the Mistral API and a generic method for generating responses.
     """
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "mistral-large-latest"):
-        # Allow passing API key or fallback to environment; if missing, run in disabled mode
+    def __init__(self, api_key: Optional[str] = None, model: str = "mistral-large-latest",
+                 server_url: Optional[str] = None):
+        # Allow passing API key or fallback to environment; if missing, run in disabled mode.
+        # Agents borrow the process-wide pooled client instead of opening their own.
+        # MISTRAL_SERVER_URL redirects requests, e.g. to the offline mock_llm_server.py
         api_key = api_key or os.getenv('MISTRAL_API_KEY')
-        self.client = Mistral(api_key=api_key) if api_key else None
+        self.server_url = server_url or os.getenv('MISTRAL_SERVER_URL') or None
+        self.client = get_llm_client(api_key, self.server_url) if api_key else None
         self.model = model
         self.system_message: Optional[SystemMessage] = None
+        # Optional request timeout (seconds) so a hung call frees its worker thread
+        self.timeout_s: Optional[float] = None
 
-    def get_response(self, prompt: str, temperature: float = 0.7, max_tokens: int = 1024) -> str:
+    # Process-wide response cache shared by all agents (see agents/response_cache.py)
+    cache = default_cache
+
+    @property
+    def name(self) -> str:
+        """Label used for this agent in the metrics registry"""
+        return type(self).__name__
+
+    def get_response(self, prompt: str, temperature: float = 0.7, max_tokens: int = 1024, fresh: bool = False) -> str:
         """
         Send a prompt to the Mistral API and return the model response.
+        Identical requests within the cache TTL are served from the response cache;
+        fresh=True always issues a new request (e.g. a hedged duplicate) and caches its result.
         """
         if self.client is None:
             return "LLM disabled: missing Mistral API key. Set MISTRAL_API_KEY to enable this agent."
+        system = self.system_message.content if self.system_message else ""
+        if not self.cache.enabled:
+            return self._complete(system, prompt, temperature, max_tokens)
+        key = self.cache.make_key(self.model, system, temperature, max_tokens, prompt)
+        if fresh:
+            text = self._complete(system, prompt, temperature, max_tokens)
+            if not text.startswith("Error generating response"):
+                self.cache.put(key, text)
+            return text
+
+        start = time.perf_counter()
+        computed = []
+
+        def compute():
+            computed.append(True)
+            return self._complete(system, prompt, temperature, max_tokens)
+
+        text = self.cache.get_or_compute(
+            key,
+            compute,
+            cacheable=lambda text: isinstance(text, str) and not text.startswith("Error generating response"),
+        )
+        if not computed:
+            agent_metrics.record(self.name, time.perf_counter() - start, cache_hit=True)
+        return text
+
+    def stream_response(self, prompt: str, temperature: float = 0.7, max_tokens: int = 1024):
+        """
+        Stream the model response, yielding text deltas as they arrive.
+        A cached response is yielded in one piece; the streamed text is cached once complete.
+        An identical request already in flight (streamed or not) is waited on and its
+        result yielded in one piece, as get_response does, instead of paying for it twice.
+        A failed request raises, even after some deltas were yielded.
+        """
+        if self.client is None:
+            yield "LLM disabled: missing Mistral API key. Set MISTRAL_API_KEY to enable this agent."
+            return
+        system = self.system_message.content if self.system_message else ""
+        if not self.cache.enabled:
+            yield from self._stream(system, prompt, temperature, max_tokens)
+            return
+        key = self.cache.make_key(self.model, system, temperature, max_tokens, prompt)
+        start = time.perf_counter()
+        cached, token = self.cache.acquire(key)
+        if token is None:
+            agent_metrics.record(self.name, time.perf_counter() - start, cache_hit=True)
+            yield cached
+            return
+        parts = []
+        try:
+            for delta in self._stream(system, prompt, temperature, max_tokens):
+                parts.append(delta)
+                yield delta
+        except BaseException:
+            parts = []
+            raise
+        finally:
+            # Also runs if the consumer abandons the stream, so waiters are never left hanging
+            self.cache.release(key, token, "".join(parts) or None)
+
+    def _stream(self, system: str, prompt: str, temperature: float, max_tokens: int):
+        parts = []
+        usage = None
+        ttft = None
+        start = time.perf_counter()
+        try:
+            with llm_limiter.acquire(estimate_tokens(system) + estimate_tokens(prompt)):
+                for event in self.client.chat.stream(**self._build_request(system, prompt, temperature, max_tokens)):
+                    usage = getattr(event.data, "usage", None) or usage
+                    delta = event.data.choices[0].delta.content
+                    if isinstance(delta, str) and delta:
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                        parts.append(delta)
+                        yield delta
+            completion_tokens = getattr(usage, "completion_tokens", None) or estimate_tokens("".join(parts))
+            llm_limiter.charge(completion_tokens)
+            agent_metrics.record(
+                self.name, time.perf_counter() - start, ttft_s=ttft,
+                prompt_tokens=getattr(usage, "prompt_tokens", None) or estimate_tokens(system) + estimate_tokens(prompt),
+                completion_tokens=completion_tokens,
+            )
+        except Exception:
+            agent_metrics.record(self.name, time.perf_counter() - start, ttft_s=ttft, error=True)
+            raise
+
+    def respond(self, prompt: str, on_token=None, **kwargs) -> str:
+        """
+        Return the full response text. With on_token, the response is streamed and
+        each delta is passed to on_token(delta) before the aggregated text is returned;
+        if the stream fails, the result is "Error generating response: ..." instead.
+        """
+        if on_token is None:
+            return self.get_response(prompt, **kwargs)
+        parts = []
+        try:
+            for delta in self.stream_response(prompt, **kwargs):
+                parts.append(delta)
+                on_token(delta)
+        except Exception as e:
+            # A stream cut off part-way is a failed call, not a shorter analysis
+            return f"Error generating response: {e}"
+        return "".join(parts)
+
+    def _build_request(self, system: str, prompt: str, temperature: float, max_tokens: int) -> dict:
+        request = dict(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        if self.timeout_s:
+            request["timeout_ms"] = int(self.timeout_s * 1000)
+        return request
+
+    def _complete(self, system: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        start = time.perf_counter()
         try:
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_message.content if self.system_message else ""},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
+            with llm_limiter.acquire(estimate_tokens(system) + estimate_tokens(prompt)):
+                response = self.client.chat.complete(**self._build_request(system, prompt, temperature, max_tokens))
+            text = response.choices[0].message.content
+            usage = getattr(response, "usage", None)
+            completion_tokens = getattr(usage, "completion_tokens", None) or estimate_tokens(text or "")
+            llm_limiter.charge(completion_tokens)
+            wall = time.perf_counter() - start
+            agent_metrics.record(
+                self.name, wall, ttft_s=wall,
+                prompt_tokens=getattr(usage, "prompt_tokens", None) or estimate_tokens(system) + estimate_tokens(prompt),
+                completion_tokens=completion_tokens,
             )
-            return response.choices[0].message.content
+            return text
         except Exception as e:
+            agent_metrics.record(self.name, time.perf_counter() - start, error=True)
             return f"Error generating response: {e}"
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class LatencyTracker:
+    """Rolling per-agent latency samples used to time hedged requests."""
+
+    def __init__(self, window: int = 50):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self._samples[name].append(seconds)
+
+    def percentile(self, name: str, pct: float, min_samples: int = 5):
+        """Latency percentile for an agent, or None until enough samples exist."""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+# Prefixes of a failed agent's text: fan-out failures ("Error: ...") and LLM calls that
+# BaseAgent caught ("Error generating response: ...")
+ERROR_PREFIXES = ("Error:", "Error generating response")
+
+
+def is_error(value):
+    """True if a task result is an error report rather than an actual analysis"""
+    return isinstance(value, str) and value.startswith(ERROR_PREFIXES)
+
+
+class AgentResults(dict):
+    """
+    Results of a fan-out, in task order. Agents that did not deliver are still
+    present (as "Error: ..." text) and listed in `missing` with the reason.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.missing = {}
+
+
+def run_concurrently(tasks, max_workers=None, timeout=None, quorum=None, deadline=None,
+                     hedges=None, hedge_after=None, latency=None):
+    """
+    Run independent, named callables on a bounded thread pool.
+
+    tasks: dict of name -> zero-argument callable (order is preserved in the result).
+    max_workers: concurrency cap, defaults to one thread per task.
+    timeout: per-task budget in seconds (a number, or a dict of name -> seconds),
+        measured from when the task starts running.
+    quorum: return as soon as this many tasks have finished (defaults to all of them).
+    deadline: absolute time.monotonic() value after which nothing more is awaited.
+    hedges: dict of name -> callable issuing a duplicate request for a straggler.
+    hedge_after: function name -> seconds (or None) after which the hedge fires.
+    latency: LatencyTracker that receives the completion time of each task.
+
+    Returns AgentResults. Tasks that raised, returned error text (see is_error), ran
+    over their budget or were still outstanding once the quorum or deadline was reached
+    map to an "Error: ..." string, are listed in `missing` and do not count toward the quorum.
+    """
+    results = AgentResults()
+    if not tasks:
+        return results
+    max_workers = max(1, min(max_workers or len(tasks), len(tasks)))
+    quorum = len(tasks) if quorum is None else max(1, min(quorum, len(tasks)))
+    hedges = hedges or {}
+
+    def budget(name):
+        return timeout.get(name) if isinstance(timeout, dict) else timeout
+
+    started = {}
+
+    def _run(name, func):
+        started.setdefault(name, time.monotonic())
+        return func()
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent")
+    hedge_executor = None
+    futures = {executor.submit(_run, name, func): name for name, func in tasks.items()}
+    active = set(futures)
+    pending = list(tasks)
+    done_results, missing, hedged = {}, {}, set()
+    try:
+        while pending and len(done_results) < quorum:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                for name in pending:
+                    missing[name] = "cycle deadline reached"
+                pending = []
+                break
+
+            wake = [deadline] if deadline is not None else []
+            for name in list(pending):
+                if name not in started:
+                    continue
+                limit = budget(name)
+                if limit and now - started[name] >= limit:
+                    missing[name] = f"timed out after {limit:g}s"
+                    pending.remove(name)
+                    if latency is not None:
+                        latency.record(name, limit)
+                    continue
+                if limit:
+                    wake.append(started[name] + limit)
+                # Fire one duplicate request for a straggler past its usual latency
+                delay = hedge_after(name) if (hedge_after and name in hedges and name not in hedged) else None
+                if delay is not None:
+                    if now - started[name] >= delay:
+                        if hedge_executor is None:
+                            hedge_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+                        fut = hedge_executor.submit(hedges[name])
+                        futures[fut] = name
+                        active.add(fut)
+                        hedged.add(name)
+                    else:
+                        wake.append(started[name] + delay)
+            if not pending:
+                break
+
+            waiting = [f for f in active if futures[f] in pending]
+            if any(name not in started for name in pending):
+                # Queued tasks have no start time yet; poll until they pick up a worker
+                wake.append(now + 0.25)
+            wait_for = max(0.0, min(wake) - now) if wake else None
+            done, _ = wait(waiting, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for fut in done:
+                active.discard(fut)
+                name = futures[fut]
+                if name not in pending:
+                    continue
+                try:
+                    value = fut.result()
+                    failure = f"failed: {value.split(':', 1)[-1].strip()}" if is_error(value) else None
+                except Exception as e:
+                    failure = f"failed: {str(e)}"
+                if failure is not None:
+                    # Let a still-running duplicate answer before reporting the failure
+                    if any(futures[f] == name for f in active):
+                        continue
+                    missing[name] = failure
+                else:
+                    done_results[name] = value
+                pending.remove(name)
+                if latency is not None and name in started:
+                    latency.record(name, time.monotonic() - started[name])
+        for name in pending:
+            missing.setdefault(name, "not completed before consensus")
+    finally:
+        # Do not block on stragglers; queued tasks that never started are dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+        if hedge_executor is not None:
+            hedge_executor.shutdown(wait=False, cancel_futures=True)
+
+    for name in tasks:
+        if name in done_results:
+            results[name] = done_results[name]
+        else:
+            results[name] = f"Error: {missing[name]}"
+            results.missing[name] = missing[name]
+    return results
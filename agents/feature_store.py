@@ -0,0 +1,163 @@
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .forecast_checkpoint import normalization_stats
+from .sequence_windows import WindowSet
+
+
+class _SymbolRows:
+    """Append-only feature rows of one symbol in a geometrically grown buffer"""
+
+    def __init__(self, n_features):
+        self.features = np.empty((256, n_features))
+        self.close = np.empty(256)
+        self.timestamps = np.empty(256, dtype=np.int64)
+        self.size = 0
+
+    def append(self, features, close, timestamps):
+        needed = self.size + len(features)
+        if needed > len(self.features):
+            capacity = max(needed, 2 * len(self.features))
+            for name in ('features', 'close', 'timestamps'):
+                old = getattr(self, name)
+                grown = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+                grown[:self.size] = old[:self.size]
+                setattr(self, name, grown)
+        self.features[self.size:needed] = features
+        self.close[self.size:needed] = close
+        self.timestamps[self.size:needed] = timestamps
+        self.size = needed
+
+
+class FeatureStore:
+    """
+    Materialized forecaster features, kept current from the append-only history CSV.
+
+    refresh() parses only the bytes appended since the last call, drops rows with
+    missing features and appends the rest to per-symbol arrays, so neither training
+    nor inference re-reads or re-derives the history. A rewritten file is detected
+    and reloaded from scratch.
+    """
+
+    def __init__(self, csv_path, feature_cols, window=60):
+        self.csv_path = csv_path
+        self.feature_cols = list(feature_cols)
+        self.window = window
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._symbols = {}
+        self._columns = None
+        self._offset = 0
+        self._tail = b''
+        self.rows = 0
+        self.watermark = None
+
+    def refresh(self):
+        """Ingest rows appended to the CSV since the last refresh; returns how many were added"""
+        with self._lock:
+            if not self.csv_path or not os.path.exists(self.csv_path):
+                return 0
+            with open(self.csv_path, 'rb') as f:
+                # The last ingested line must still end at the offset, otherwise the file was rewritten
+                f.seek(max(self._offset - len(self._tail), 0))
+                if f.read(len(self._tail)) != self._tail:
+                    self._reset()
+                    f.seek(0)
+                chunk = f.read()
+            # Only complete lines; a row still being written is picked up next time
+            end = chunk.rfind(b'\n') + 1
+            if end == 0:
+                return 0
+            chunk = chunk[:end]
+            self._tail = chunk[chunk.rfind(b'\n', 0, end - 1) + 1:]
+            if self._columns is None:
+                header, _, chunk = chunk.partition(b'\n')
+                self._columns = header.decode().strip().split(',')
+            self._offset += end
+            if not chunk.strip():
+                return 0
+            df = pd.read_csv(io.BytesIO(chunk), header=None, names=self._columns,
+                             usecols=['timestamp', 'symbol'] + self.feature_cols)
+            return self._ingest(df)
+
+    def _ingest(self, df):
+        df = df.dropna(subset=self.feature_cols)
+        if df.empty:
+            return 0
+        df = df.sort_values(['symbol', 'timestamp'], kind='stable')
+        features = df[self.feature_cols].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        timestamps = df['timestamp'].to_numpy(dtype=np.int64)
+        symbols = df['symbol'].to_numpy()
+        boundaries = np.flatnonzero(symbols[1:] != symbols[:-1]) + 1
+        for first, end in zip(np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(df)]))):
+            rows = self._symbols.get(symbols[first])
+            if rows is None:
+                rows = self._symbols[symbols[first]] = _SymbolRows(len(self.feature_cols))
+            rows.append(features[first:end], close[first:end], timestamps[first:end])
+        self.rows += len(df)
+        latest = int(timestamps.max())
+        self.watermark = latest if self.watermark is None else max(self.watermark, latest)
+        return len(df)
+
+    def symbol_rows(self, symbol):
+        rows = self._symbols.get(symbol)
+        return rows.size if rows else 0
+
+    def rows_after(self, watermark):
+        """Number of rows newer than a timestamp"""
+        with self._lock:
+            return int(sum(
+                rows.size - np.searchsorted(rows.timestamps[:rows.size], watermark, side='right')
+                for rows in self._symbols.values()
+            ))
+
+    def latest(self, symbol):
+        """(timestamp, raw feature rows) of the symbol's most recent window, or None if it is too short"""
+        with self._lock:
+            rows = self._symbols.get(symbol)
+            if rows is None or rows.size < self.window:
+                return None
+            return int(rows.timestamps[rows.size - 1]), rows.features[rows.size - self.window:rows.size].copy()
+
+    def snapshot(self, min_rows=0, since=None, normalize=None):
+        """
+        (WindowSet, info) over the stored rows of every symbol with at least min_rows of them.
+        since=timestamp keeps only rows newer than it plus the preceding window of context.
+        normalize=(mean, std) standardizes the features (a fine-tune keeps its model's
+        statistics); by default they are computed from exactly the rows captured, so the
+        statistics a checkpoint stores are the ones its training data was normalized with.
+        info describes the rows captured: watermark, rows (total), new_rows (newer than
+        since) and norm_mean / norm_std. Everything is read under one lock, so rows
+        ingested while a model trains are left for the next run
+        """
+        with self._lock:
+            info = {'watermark': self.watermark, 'rows': self.rows, 'new_rows': 0}
+            features, close, ranges, start = [], [], {}, 0
+            for symbol, rows in self._symbols.items():
+                first = 0
+                if since is not None:
+                    new_first = int(np.searchsorted(rows.timestamps[:rows.size], since, side='right'))
+                    info['new_rows'] += rows.size - new_first
+                    first = max(0, new_first - self.window)
+                count = rows.size - first
+                if count < max(min_rows, 1):
+                    continue
+                features.append(rows.features[first:rows.size])
+                close.append(rows.close[first:rows.size])
+                ranges[symbol] = (start, start + count)
+                start += count
+        if not features:
+            info['norm_mean'], info['norm_std'] = normalize if normalize is not None else (None, None)
+            return WindowSet(np.empty((0, len(self.feature_cols))), np.empty(0), {}, window=self.window), info
+        data = np.concatenate(features)
+        mean, std = normalize if normalize is not None else normalization_stats(data)
+        info['norm_mean'], info['norm_std'] = list(mean), list(std)
+        data = (data - np.asarray(mean)) / np.asarray(std)
+        return WindowSet(data, np.concatenate(close), ranges, window=self.window), info
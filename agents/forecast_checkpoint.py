@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from .lstm_runtime import NumpyLSTMModel, export_weights
+
+
+class ForecastCheckpointStore:
+    """
+    Versioned on-disk checkpoints of the forecast model.
+
+    Each version is a directory holding the Keras model, its NumPy weight export and
+    a metadata.json (feature set, window, data watermark, normalization stats). latest.json names
+    the current version and is replaced atomically once a version is complete, so
+    readers never see a half-written checkpoint. Only the newest `keep` versions stay.
+    Several trainers (API, Streamlit sessions) may share a directory: each version
+    directory is claimed with an exclusive mkdir, and latest.json never moves backwards.
+    """
+
+    def __init__(self, directory, keep=3):
+        self.directory = directory
+        self.keep = keep
+
+    def _version_dir(self, version):
+        return os.path.join(self.directory, f"v{version:04d}")
+
+    def weights_path(self, version):
+        """NumPy export of a version's weights (see agents/lstm_runtime.py)"""
+        return os.path.join(self._version_dir(version), 'weights.npz')
+
+    def latest_version(self):
+        """Version named by latest.json, or None"""
+        try:
+            with open(os.path.join(self.directory, 'latest.json')) as f:
+                return json.load(f)['version']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def latest_metadata(self):
+        """Metadata of the current version, or None if there is no checkpoint"""
+        version = self.latest_version()
+        if version is None:
+            return None
+        try:
+            with open(os.path.join(self._version_dir(version), 'metadata.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _claim_version(self):
+        """Create the next free version directory; mkdir fails if another trainer got there first"""
+        version = (self.latest_version() or 0) + 1
+        while True:
+            try:
+                os.mkdir(self._version_dir(version))
+                return version
+            except FileExistsError:
+                version += 1
+
+    def save(self, model, metadata):
+        """Write a new version and make it current; returns the saved metadata"""
+        os.makedirs(self.directory, exist_ok=True)
+        version = self._claim_version()
+        metadata = dict(metadata, version=version, saved_at=time.time())
+
+        path = self._version_dir(version)
+        model.save(os.path.join(path, 'model.keras'))
+        export_weights(model, self.weights_path(version))
+        with open(os.path.join(path, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f)
+
+        tmp_path = os.path.join(self.directory, f'latest.json.{version}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': version}, f)
+        # A trainer that claimed a later version may have published already
+        if (self.latest_version() or 0) < version:
+            os.replace(tmp_path, os.path.join(self.directory, 'latest.json'))
+            self._prune(version)
+        else:
+            os.remove(tmp_path)
+        return metadata
+
+    def load(self, metadata=None):
+        """Load (model, metadata) for the current version, or (None, None)"""
+        metadata = metadata or self.latest_metadata()
+        if metadata is None:
+            return None, None
+        try:
+            from tensorflow import keras
+            model = keras.models.load_model(os.path.join(self._version_dir(metadata['version']), 'model.keras'))
+            return model, metadata
+        except Exception as e:
+            print(f"Error loading forecast checkpoint v{metadata.get('version')}: {e}")
+            return None, None
+
+    def load_numpy(self, metadata=None):
+        """Load (NumpyLSTMModel, metadata) for the current version without importing TensorFlow"""
+        metadata = metadata or self.latest_metadata()
+        if metadata is None:
+            return None, None
+        try:
+            return NumpyLSTMModel.load(self.weights_path(metadata['version'])), metadata
+        except Exception as e:
+            print(f"Error loading forecast weights v{metadata.get('version')}: {e}")
+            return None, None
+
+    def _prune(self, current_version):
+        for name in os.listdir(self.directory):
+            if name.startswith('v') and name[1:].isdigit() and int(name[1:]) <= current_version - self.keep:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+
+def normalization_stats(data):
+    """Per-feature mean and std over the rows of a 2D array (std floored to avoid division by zero)"""
+    mean = np.nanmean(data, axis=0)
+    std = np.nanstd(data, axis=0)
+    std = np.where(np.isfinite(std) & (std > 1e-8), std, 1.0)
+    return np.nan_to_num(mean).tolist(), std.tolist()
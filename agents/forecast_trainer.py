@@ -0,0 +1,260 @@
+import itertools
+import os
+import threading
+import time
+
+import numpy as np
+
+from .forecast_checkpoint import ForecastCheckpointStore
+from .lstm_runtime import NumpyLSTMModel
+
+
+FEATURE_COLS = ['close', 'volume', 'RSI', 'SMA_20', 'SMA_50', 'MACD', 'MACD_SIGNAL', 'MACD_HIST']
+WINDOW = 60
+BATCH_SIZE = 64
+PREFETCH_BATCHES = 4
+
+
+def build_model(input_dim, window=WINDOW):
+    """Two-layer LSTM regressor of the next close return (None if TensorFlow is unavailable)"""
+    try:
+        # Lazy import to avoid heavy deps if unused
+        from tensorflow import keras
+        from tensorflow.keras import layers
+
+        model = keras.Sequential([
+            layers.Input(shape=(window, input_dim)),
+            layers.LSTM(64, return_sequences=True),
+            layers.Dropout(0.2),
+            layers.LSTM(32),
+            layers.Dense(16, activation='relu'),
+            layers.Dense(1)
+        ])
+        model.compile(optimizer='adam', loss='mse')
+        return model
+    except Exception:
+        return None
+
+
+def window_dataset(windows, batch_size=BATCH_SIZE, seed=None):
+    """
+    Stream shuffled float32 batches out of a WindowSet as a prefetched tf.data pipeline.
+    Only the batches in flight are materialized, so memory no longer grows with history length
+    """
+    import tensorflow as tf
+
+    epochs = itertools.count()
+
+    def generate():
+        # A fresh shuffle every epoch (the generator is re-entered per epoch)
+        epoch_seed = None if seed is None else seed + next(epochs)
+        for X, y in windows.batches(batch_size, shuffle=True, seed=epoch_seed):
+            yield X.astype(np.float32), y.astype(np.float32)
+
+    n_features = windows.data.shape[1]
+    dataset = tf.data.Dataset.from_generator(generate, output_signature=(
+        tf.TensorSpec((None, windows.window, n_features), tf.float32),
+        tf.TensorSpec((None,), tf.float32),
+    ))
+    n_batches = -(-len(windows) // batch_size)
+    return dataset.apply(tf.data.experimental.assert_cardinality(n_batches)).prefetch(PREFETCH_BATCHES)
+
+
+def train_full(store, epochs=2):
+    """Train a new model on the feature store's full history; returns (model, metadata) or (None, None)"""
+    # One contiguous array for every symbol with enough history; windows are strided views.
+    # The watermark and row count describe this snapshot, not rows ingested during fit
+    windows, info = store.snapshot(min_rows=200)
+    if len(windows) == 0:
+        return None, None
+    model = build_model(len(FEATURE_COLS))
+    if model is None:
+        return None, None
+    # Light training to avoid heavy compute
+    try:
+        model.fit(window_dataset(windows), epochs=epochs, shuffle=False, verbose=0)
+    except Exception as e:
+        print(f"Error training forecast model: {e}")
+        return None, None
+    return model, {
+        'feature_cols': FEATURE_COLS,
+        'window': WINDOW,
+        'watermark': info['watermark'],
+        'norm_mean': info['norm_mean'],
+        'norm_std': info['norm_std'],
+        'trained_rows': info['rows'],
+    }
+
+
+def new_rows(store, metadata):
+    """Number of stored rows newer than the model's watermark"""
+    return store.rows_after(metadata['watermark'])
+
+
+def fine_tune(model, metadata, store, epochs=2):
+    """
+    Continue training on rows newer than the watermark only (each symbol keeps the
+    preceding WINDOW rows as context). Returns the updated metadata, or None if nothing trained
+    """
+    windows, info = store.snapshot(min_rows=WINDOW + 2, since=metadata['watermark'],
+                                   normalize=(metadata['norm_mean'], metadata['norm_std']))
+    if len(windows) == 0:
+        return None
+    try:
+        model.fit(window_dataset(windows), epochs=epochs, shuffle=False, verbose=0)
+    except Exception as e:
+        print(f"Error fine-tuning forecast model: {e}")
+        return None
+    return dict(
+        metadata,
+        watermark=info['watermark'],
+        trained_rows=metadata.get('trained_rows', 0) + info['new_rows'],
+    )
+
+
+class ForecastTrainer:
+    """
+    Keeps the forecast model current off the request path.
+
+    A daemon thread polls the checkpoint store and the feature store: it publishes
+    the newest saved version (including ones written by another process), then
+    trains (no model yet) or fine-tunes a private Keras model whenever
+    min_new_rows new rows arrived, or any new rows once interval_s has passed
+    since the last run. Each result is checkpointed and handed to agent.publish(),
+    which swaps it in atomically. With agent.runtime == 'numpy' the published model
+    is a NumpyLSTMModel, and with agent.training off TensorFlow is never imported.
+    """
+
+    def __init__(self, agent, interval_s=3600.0, poll_s=60.0, min_new_rows=200):
+        self.agent = agent
+        self.interval_s = interval_s
+        self.poll_s = poll_s
+        self.min_new_rows = min_new_rows
+        self.last_trained = None
+        self.runs = 0
+        self._checked_rows = None
+        self._keras = (None, None)  # (Keras model, version) kept for fine-tuning
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()  # guards the thread handle only
+        self._train_lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="forecast-trainer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.train_once()
+            except Exception as e:
+                print(f"Error in forecast training worker: {e}")
+            self._stop.wait(self.poll_s)
+
+    def _store(self):
+        return ForecastCheckpointStore(self.agent.model_dir) if self.agent.model_dir else None
+
+    def pick_up_checkpoint(self):
+        """Publish the store's current version if it is newer than the published one"""
+        store = self._store()
+        if store is None:
+            return
+        metadata = store.latest_metadata()
+        current = self.agent.metadata
+        if metadata is None or metadata.get('feature_cols') != FEATURE_COLS:
+            return
+        if current is not None and metadata['version'] <= current.get('version', 0):
+            return
+        if self.agent.runtime == 'numpy':
+            model, metadata = store.load_numpy(metadata)
+        else:
+            model, metadata = store.load(metadata)
+            if model is not None:
+                self._keras = (model, metadata['version'])
+                model = self._clone(model)
+        if model is not None:
+            self.agent.publish(model, metadata)
+
+    def _training_model(self, metadata):
+        """Private Keras model matching the published version (loaded lazily from its checkpoint)"""
+        model, version = self._keras
+        if model is None or version != metadata.get('version'):
+            store = self._store()
+            model = store.load(metadata)[0] if store is not None else None
+            if model is None and self.agent.runtime != 'numpy':
+                model = self._clone(self.agent.forecast_model_obj)
+            if model is None:
+                return None
+            self._keras = (model, metadata.get('version'))
+        return model
+
+    def _publish(self, model, metadata):
+        self._keras = (model, metadata.get('version'))
+        if self.agent.runtime == 'numpy':
+            try:
+                self.agent.publish(NumpyLSTMModel.from_keras(model), metadata)
+                return
+            except Exception as e:
+                print(f"Error converting forecast model to the NumPy runtime, serving Keras: {e}")
+        # Inference keeps its own copy so the next fine-tune never touches the served model
+        self.agent.publish(self._clone(model) or model, metadata)
+
+    def train_once(self):
+        """Run one training decision; returns True when a new model version was published"""
+        with self._train_lock:
+            self.pick_up_checkpoint()
+            if not self.agent.training:
+                return False
+
+            csv_path = self.agent.csv_path
+            if not csv_path or not os.path.exists(csv_path):
+                return False
+            store = self.agent.feature_store
+            store.refresh()
+            current = self.agent.metadata
+            last_trained = self.last_trained or (current or {}).get('saved_at')
+            due = last_trained is None or time.time() - last_trained >= self.interval_s
+            if store.rows == 0 or (store.rows == self._checked_rows and not due):
+                return False
+            self._checked_rows = store.rows
+
+            if current is None:
+                model, metadata = train_full(store)
+            else:
+                pending = new_rows(store, current)
+                if pending == 0 or (pending < self.min_new_rows and not due):
+                    return False
+                model = self._training_model(current)
+                metadata = fine_tune(model, current, store) if model is not None else None
+            if model is None or metadata is None:
+                return False
+
+            checkpoints = self._store()
+            if checkpoints is not None:
+                try:
+                    metadata = checkpoints.save(model, metadata)
+                except Exception as e:
+                    print(f"Error saving forecast checkpoint: {e}")
+            else:
+                metadata = dict(metadata, version=(current or {}).get('version', 0) + 1)
+            self._publish(model, metadata)
+            self.last_trained = time.time()
+            self.runs += 1
+            return True
+
+    @staticmethod
+    def _clone(model):
+        try:
+            from tensorflow import keras
+            clone = keras.models.clone_model(model)
+            clone.set_weights(model.get_weights())
+            clone.compile(optimizer='adam', loss='mse')
+            return clone
+        except Exception:
+            return None
@@ -0,0 +1,106 @@
+import importlib.util
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+from mistralai import Mistral
+
+
+class RateLimiter:
+    """
+    Process-wide limits shared by every LLM caller: a cap on concurrent requests and
+    an optional tokens-per-minute budget (token bucket refilled continuously).
+    """
+
+    def __init__(self, max_concurrency: int = 8, tokens_per_minute: int = 0):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        rate = self.tokens_per_minute / 60.0
+        self._tokens = min(float(self.tokens_per_minute), self._tokens + (now - self._updated) * rate)
+        self._updated = now
+
+    def _take_tokens(self, tokens: int):
+        if not self.tokens_per_minute or tokens <= 0:
+            return
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / (self.tokens_per_minute / 60.0)
+            time.sleep(min(wait, 1.0))
+
+    def charge(self, tokens: int):
+        """Debit tokens that were only known after the response (completion tokens)."""
+        if not self.tokens_per_minute or tokens <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+
+    @contextmanager
+    def acquire(self, tokens: int = 0):
+        """Hold one request slot (after reserving `tokens` of the per-minute budget)."""
+        self._take_tokens(tokens)
+        self._slots.acquire()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+
+def _pooled_http_client() -> httpx.Client:
+    """Keep-alive connection pool shared by all Mistral clients (HTTP/2 when h2 is installed)."""
+    connections = int(os.getenv("LLM_POOL_CONNECTIONS", "16"))
+    http2 = os.getenv("LLM_HTTP2", "1") != "0" and importlib.util.find_spec("h2") is not None
+    return httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=connections,
+            max_keepalive_connections=connections,
+            keepalive_expiry=120,
+        ),
+        timeout=httpx.Timeout(120.0, connect=10.0),
+    )
+
+
+_lock = threading.Lock()
+_http_client = None
+_clients = {}
+
+# Global limiter shared by every agent in the process
+llm_limiter = RateLimiter(
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+    tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", "0")),
+)
+
+
+def get_llm_client(api_key: str, server_url: str = None) -> Mistral:
+    """
+    Return the process-wide Mistral client for this API key and server, creating it on
+    first use. server_url points the client at another endpoint (e.g. mock_llm_server.py).
+    """
+    global _http_client
+    key = (api_key, server_url)
+    with _lock:
+        if key not in _clients:
+            if _http_client is None:
+                _http_client = _pooled_http_client()
+            _clients[key] = Mistral(api_key=api_key, server_url=server_url or None, client=_http_client)
+        return _clients[key]
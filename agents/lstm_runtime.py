@@ -0,0 +1,143 @@
+"""
+TensorFlow-free inference for the forecast LSTM.
+
+export_weights() dumps a trained Keras Sequential model (LSTM / Dropout / Dense
+layers) into a single .npz file; NumpyLSTMModel runs the same forward pass in
+plain NumPy and exposes predict_on_batch() like the Keras model it replaces.
+
+Usage (export the latest checkpoint and check it against Keras):
+    python -m agents.lstm_runtime models/forecast
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+}
+
+
+def _collect(model):
+    """Layer spec and float32 weights of a Keras Sequential model"""
+    spec, arrays = [], {}
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == 'Dropout':
+            continue  # inactive at inference
+        config = layer.get_config()
+        if kind == 'LSTM':
+            if config.get('activation') != 'tanh' or config.get('recurrent_activation') != 'sigmoid':
+                raise ValueError(f"Unsupported LSTM activations in layer {layer.name}")
+            spec.append({'type': 'lstm', 'return_sequences': bool(config.get('return_sequences'))})
+            names = ('kernel', 'recurrent_kernel', 'bias')
+        elif kind == 'Dense':
+            activation = config.get('activation', 'linear')
+            if activation not in _ACTIVATIONS:
+                raise ValueError(f"Unsupported activation {activation} in layer {layer.name}")
+            spec.append({'type': 'dense', 'activation': activation})
+            names = ('kernel', 'bias')
+        else:
+            raise ValueError(f"Unsupported layer type {kind}")
+        for name, value in zip(names, layer.get_weights()):
+            arrays[f"{len(spec) - 1}_{name}"] = np.asarray(value, dtype=np.float32)
+    return spec, arrays
+
+
+def export_weights(model, path):
+    """Write the layer spec and weights of a Keras Sequential model to an .npz file"""
+    spec, arrays = _collect(model)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, spec=np.array(json.dumps(spec)), **arrays)
+    os.replace(tmp_path, path)
+
+
+class NumpyLSTMModel:
+    """Forward pass of an exported LSTM stack; a drop-in for model.predict_on_batch at inference"""
+
+    def __init__(self, spec, weights):
+        self.spec = spec
+        self.weights = weights
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            spec = json.loads(str(data['spec']))
+            weights = {key: data[key].astype(np.float64) for key in data.files if key != 'spec'}
+        return cls(spec, weights)
+
+    @classmethod
+    def from_keras(cls, model):
+        """Copy the weights of an in-memory Keras model (no file round trip)"""
+        spec, arrays = _collect(model)
+        return cls(spec, {key: value.astype(np.float64) for key, value in arrays.items()})
+
+    def _lstm(self, x, index, return_sequences):
+        kernel = self.weights[f"{index}_kernel"]
+        recurrent = self.weights[f"{index}_recurrent_kernel"]
+        bias = self.weights[f"{index}_bias"]
+        units = recurrent.shape[0]
+        batch, steps, _ = x.shape
+        # Input projections for every step at once; only the recurrence is sequential
+        projected = x @ kernel + bias
+        h = np.zeros((batch, units))
+        c = np.zeros((batch, units))
+        outputs = np.empty((batch, steps, units)) if return_sequences else None
+        for t in range(steps):
+            z = projected[:, t] + h @ recurrent
+            # Keras gate order: input, forget, cell, output
+            i = _sigmoid(z[:, :units])
+            f = _sigmoid(z[:, units:2 * units])
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = _sigmoid(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            if return_sequences:
+                outputs[:, t] = h
+        return outputs if return_sequences else h
+
+    def predict_on_batch(self, batch):
+        x = np.asarray(batch, dtype=np.float64)
+        for index, layer in enumerate(self.spec):
+            if layer['type'] == 'lstm':
+                x = self._lstm(x, index, layer['return_sequences'])
+            else:
+                x = _ACTIVATIONS[layer['activation']](x @ self.weights[f"{index}_kernel"] + self.weights[f"{index}_bias"])
+        return x
+
+    predict = predict_on_batch
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    model_dir = argv[0] if argv else os.getenv('FORECAST_MODEL_DIR', 'models/forecast')
+
+    from .forecast_checkpoint import ForecastCheckpointStore
+    store = ForecastCheckpointStore(model_dir)
+    model, metadata = store.load()
+    if model is None:
+        print(f"No forecast checkpoint in {model_dir}")
+        return 1
+    path = store.weights_path(metadata['version'])
+    export_weights(model, path)
+
+    window, features = model.input_shape[1], model.input_shape[2]
+    batch = np.random.default_rng(0).normal(size=(32, window, features)).astype(np.float32)
+    expected = np.asarray(model.predict_on_batch(batch))
+    actual = NumpyLSTMModel.load(path).predict_on_batch(batch)
+    print(f"Exported v{metadata['version']} to {path} ({os.path.getsize(path) / 1024:.0f} KiB); "
+          f"max abs diff vs Keras: {np.max(np.abs(expected - actual)):.2e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import json
+import math
+import threading
+import time
+from types import MappingProxyType
+
+from .prompt_encoding import MARKET_FIELDS, TokenBudgeter, encode_market_table
+
+
+def _num(value):
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return v if math.isfinite(v) else float("nan")
+
+
+class MarketContext:
+    """
+    Immutable snapshot of one cycle's market data.
+
+    Built once per cycle and shared by every agent and page; the serialized forms
+    (CSV table, JSON, budgeted tables) are computed on first use and cached, so
+    all consumers reuse the same strings instead of re-formatting the data.
+    """
+
+    def __init__(self, market_data: dict, multi_pair: bool = True, built_at: float = None):
+        if multi_pair:
+            data = {
+                symbol: MappingProxyType({k: _num(md.get(k, 0)) for k in MARKET_FIELDS})
+                for symbol, md in market_data.items()
+            }
+        else:
+            data = {k: _num(market_data.get(k, 0)) for k in MARKET_FIELDS}
+        object.__setattr__(self, "data", MappingProxyType(data))
+        object.__setattr__(self, "multi_pair", multi_pair)
+        object.__setattr__(self, "built_at", built_at if built_at is not None else time.time())
+        object.__setattr__(self, "_serialized", {})
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MarketContext is immutable")
+
+    @classmethod
+    def coerce(cls, market_data, multi_pair: bool = True) -> "MarketContext":
+        """Accept either a raw market data dict or an existing context."""
+        if isinstance(market_data, cls):
+            return market_data
+        return cls(market_data, multi_pair=multi_pair)
+
+    @property
+    def symbols(self) -> list:
+        return list(self.data.keys()) if self.multi_pair else []
+
+    def age(self) -> float:
+        return time.time() - self.built_at
+
+    def subset(self, symbols) -> "MarketContext":
+        """Context restricted to the given symbols (multi-pair only)."""
+        wanted = [s for s in symbols if s in self.data]
+        return MarketContext({s: self.data[s] for s in wanted}, multi_pair=True, built_at=self.built_at)
+
+    def _cached(self, key, build):
+        with self._lock:
+            if key not in self._serialized:
+                self._serialized[key] = build()
+            return self._serialized[key]
+
+    @property
+    def table(self) -> str:
+        """Compact CSV-style table of the whole snapshot."""
+        return self._cached("table", lambda: encode_market_table(self.data, multi_pair=self.multi_pair))
+
+    @property
+    def json(self) -> str:
+        """Compact JSON of the snapshot (NaN values become null)."""
+        def build():
+            def clean(row):
+                return {k: (None if v != v else v) for k, v in row.items()}
+            if self.multi_pair:
+                payload = {symbol: clean(row) for symbol, row in self.data.items()}
+            else:
+                payload = clean(self.data)
+            return json.dumps(payload, separators=(",", ":"))
+        return self._cached("json", build)
+
+    def budgeted_table(self, max_tokens: int, base_text: str = "", always_include=()) -> str:
+        """Table trimmed to a prompt token budget; cached per budget and pinned symbols."""
+        if not self.multi_pair:
+            return self.table
+        pinned = tuple(sorted(s for s in always_include if s in self.data))
+        # Budgets depend on the system prompt length, so bucket it to share results
+        base_bucket = -(-len(base_text) // 200) * 200
+        key = ("budget", max_tokens, base_bucket, pinned)
+        return self._cached(key, lambda: TokenBudgeter(max_tokens).fit(" " * base_bucket, self.data, pinned)[0])
@@ -0,0 +1,76 @@
+import threading
+from collections import defaultdict, deque
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class _AgentStats:
+    def __init__(self, window):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.wall = deque(maxlen=window)
+        self.ttft = deque(maxlen=window)
+
+
+class MetricsRegistry:
+    """
+    In-process LLM metrics per agent: call/error/cache-hit counters, token totals and
+    rolling windows of wall time and time-to-first-token for percentile reporting.
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._stats = defaultdict(lambda: _AgentStats(self.window))
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, wall_s: float, ttft_s: float = None, prompt_tokens: int = 0,
+               completion_tokens: int = 0, error: bool = False, cache_hit: bool = False):
+        with self._lock:
+            stats = self._stats[agent]
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.cache_hits += int(cache_hit)
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            # Cache hits would drag the latency percentiles towards zero; keep them separate
+            if not cache_hit:
+                stats.wall.append(wall_s)
+                if ttft_s is not None:
+                    stats.ttft.append(ttft_s)
+
+    def snapshot(self) -> dict:
+        """Per-agent summary with p50/p90/p99 latencies (seconds) over the rolling window."""
+        with self._lock:
+            items = [(name, stats, list(stats.wall), list(stats.ttft)) for name, stats in self._stats.items()]
+        summary = {}
+        for name, stats, wall, ttft in items:
+            summary[name] = {
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "cache_hits": stats.cache_hits,
+                "prompt_tokens": stats.prompt_tokens,
+                "completion_tokens": stats.completion_tokens,
+                "wall_p50": _percentile(wall, 50),
+                "wall_p90": _percentile(wall, 90),
+                "wall_p99": _percentile(wall, 99),
+                "ttft_p50": _percentile(ttft, 50),
+                "ttft_p90": _percentile(ttft, 90),
+            }
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# Process-wide registry fed by BaseAgent
+agent_metrics = MetricsRegistry()
@@ -0,0 +1,107 @@
+import math
+
+# Column order of the compact market table
+PRICE_FIELDS = ["close", "open", "high", "low", "volume"]
+INDICATOR_FIELDS = ["RSI", "SMA_20", "SMA_50", "MACD", "MACD_SIGNAL", "MACD_HIST", "price_change_24h"]
+MARKET_FIELDS = PRICE_FIELDS + INDICATOR_FIELDS
+
+
+def format_sig(value, digits: int = 5) -> str:
+    """Format a number with `digits` significant digits, without exponent notation.
+    Missing or non-finite values become an empty cell."""
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return ""
+    if not math.isfinite(v):
+        return ""
+    if v == 0:
+        return "0"
+    magnitude = math.floor(math.log10(abs(v)))
+    if magnitude >= digits:
+        # Integer digits beyond the precision become zeros (123456789.1 -> 123460000)
+        return str(int(round(v, digits - 1 - magnitude)))
+    decimals = max(digits - 1 - magnitude, 0)
+    text = f"{v:.{decimals}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return text
+
+
+def encode_row(md: dict, digits: int = 5) -> str:
+    return ",".join(format_sig(md.get(k), digits) for k in MARKET_FIELDS)
+
+
+def encode_market_table(market_data: dict, multi_pair: bool = True, digits: int = 5) -> str:
+    """
+    CSV-style encoding of market data: one header line and one row per symbol.
+    Much cheaper in tokens than indented JSON with full-precision floats.
+    """
+    if not multi_pair:
+        return ",".join(MARKET_FIELDS) + "\n" + encode_row(market_data, digits)
+    lines = ["symbol," + ",".join(MARKET_FIELDS)]
+    for symbol, data in market_data.items():
+        lines.append(f"{symbol}," + encode_row(data, digits))
+    return "\n".join(lines)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def symbol_priority(md: dict) -> float:
+    """How interesting a symbol is right now: big moves, stretched RSI, MACD momentum."""
+    def num(key):
+        try:
+            v = float(md.get(key, 0) or 0)
+        except (TypeError, ValueError):
+            return 0.0
+        return v if math.isfinite(v) else 0.0
+
+    close = num("close")
+    macd_hist_pct = abs(num("MACD_HIST")) / close * 100 if close else 0.0
+    return abs(num("price_change_24h")) + abs(num("RSI") - 50) / 10 + macd_hist_pct
+
+
+class TokenBudgeter:
+    """
+    Keeps a multi-pair market table under a prompt token budget. When the full table
+    does not fit, the highest-priority symbols (and any that must always be included,
+    e.g. open positions) are kept and the rest are collapsed into a one-line summary.
+    """
+
+    def __init__(self, max_tokens: int, digits: int = 5):
+        self.max_tokens = max_tokens
+        self.digits = digits
+
+    def fit(self, base_text: str, market_data: dict, always_include=()) -> tuple:
+        """Return (table_text, dropped_symbols) for a prompt starting with base_text."""
+        table = encode_market_table(market_data, multi_pair=True, digits=self.digits)
+        if not self.max_tokens or estimate_tokens(base_text) + estimate_tokens(table) <= self.max_tokens:
+            return table, []
+
+        pinned = [s for s in market_data if s in set(always_include)]
+        ranked = sorted((s for s in market_data if s not in pinned),
+                        key=lambda s: symbol_priority(market_data[s]), reverse=True)
+        header = "symbol," + ",".join(MARKET_FIELDS)
+        # Reserve room for the summary line of omitted symbols
+        remaining = self.max_tokens - estimate_tokens(base_text) - estimate_tokens(header) - 40
+        kept, dropped = [], []
+        for symbol in pinned + ranked:
+            row = f"{symbol}," + encode_row(market_data[symbol], self.digits)
+            cost = estimate_tokens(row) + 1
+            if symbol in pinned or cost <= remaining:
+                kept.append(row)
+                remaining -= cost
+            else:
+                dropped.append(symbol)
+
+        lines = [header] + kept
+        if dropped:
+            changes = [float(market_data[s].get("price_change_24h", 0) or 0) for s in dropped]
+            changes = [c for c in changes if math.isfinite(c)]
+            avg_change = sum(changes) / len(changes) if changes else 0.0
+            lines.append(f"# {len(dropped)} lower-priority symbols omitted "
+                         f"(avg 24h change {avg_change:+.2f}%): {' '.join(dropped)}")
+        return "\n".join(lines), dropped
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+_FLOAT_RE = re.compile(r"-?\d+\.\d+(?:[eE][-+]?\d+)?")
+
+
+class ResponseCache:
+    """
+    Thread-safe LLM response cache with TTL expiry, LRU eviction and an optional
+    on-disk tier shared between processes (Streamlit, API loop, pages).
+
+    Concurrent requests for the same key are coalesced: one caller makes the paid
+    call while the others wait for its result instead of issuing duplicates.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 512, disk_dir: Optional[str] = None,
+                 key_digits: int = 4):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.key_digits = key_digits
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> threading.Event
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def make_key(self, model: str, system: str, temperature: float, max_tokens: int, prompt: str) -> str:
+        """Hash of the request with whitespace collapsed and floats rounded, so
+        re-fetches of the same candle map to the same entry."""
+        normalized = " ".join(prompt.split())
+        if self.key_digits:
+            normalized = _FLOAT_RE.sub(lambda m: format(float(m.group()), f".{self.key_digits}g"), normalized)
+        raw = json.dumps([model, system, round(float(temperature), 3), max_tokens, normalized])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _lookup(self, key: str):
+        """Return a cached value or None. Caller holds the lock."""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "r") as f:
+                    stored = json.load(f)
+                if stored["expires_at"] > now:
+                    self._store_memory(key, stored["expires_at"], stored["value"])
+                    self.disk_hits += 1
+                    return stored["value"]
+                os.remove(self._disk_path(key))
+            except (OSError, ValueError, KeyError):
+                pass
+        return None
+
+    def _store_memory(self, key: str, expires_at: float, value: str):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.misses += 1
+            return value
+
+    def put(self, key: str, value: str):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store_memory(key, expires_at, value)
+        if self.disk_dir:
+            try:
+                tmp_path = self._disk_path(key) + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump({"expires_at": expires_at, "value": value}, f)
+                os.replace(tmp_path, self._disk_path(key))
+            except OSError as e:
+                print(f"Error writing LLM cache entry: {e}")
+
+    def acquire(self, key: str):
+        """
+        Return (value, None) for a cached key, waiting out an identical in-flight call first.
+        Otherwise return (None, token): the caller now owns the call and must hand the
+        token to release() when done, even if it failed.
+        """
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not None:
+                    return value, None
+                event = self._inflight.get(key)
+                owner = event is None
+                if owner:
+                    event = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                else:
+                    self.coalesced += 1
+            if owner:
+                return None, event
+            # Another caller is already paying for this response; wait and re-check.
+            # If its result was not cacheable (e.g. an error) we compute our own.
+            event.wait()
+
+    def release(self, key: str, token, value: Optional[str] = None):
+        """Finish an acquired call: store value (None if it failed) and wake the waiters."""
+        try:
+            if value is not None:
+                self.put(key, value)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            token.set()
+
+    def get_or_compute(self, key: str, compute: Callable[[], str],
+                       cacheable: Callable[[str], bool] = lambda value: True) -> str:
+        """Serve from cache, wait on an identical in-flight call, or compute and store."""
+        value, token = self.acquire(key)
+        if token is None:
+            return value
+        value = None
+        try:
+            value = compute()
+            return value
+        finally:
+            self.release(key, token, value if value is not None and cacheable(value) else None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+# Process-wide cache shared by every agent
+default_cache = ResponseCache(
+    ttl=float(os.getenv("LLM_CACHE_TTL_SECONDS", "300")),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+    disk_dir=os.getenv("LLM_CACHE_DIR") or None,
+)
@@ -1,89 +1,97 @@
 from .base_agent import BaseAgent
+from .feature_store import FeatureStore
+from .forecast_trainer import FEATURE_COLS, WINDOW, ForecastTrainer
 import os
-import pandas as pd
+import threading
 import numpy as np
 
 
 class RLForecastAgent(BaseAgent):
-    def __init__(self, csv_path='market_data.csv'):
+    def __init__(self, csv_path='market_data.csv', model_dir=None):
         # BaseAgent requires an api_key, but RL agent won't use LLM here
         super().__init__(api_key=None)
         self.system_message = None
         self.csv_path = csv_path
-        self.model = None  # Lazy init
+        # Published (model, metadata) pair; replaced as a whole when a new version is ready.
+        # BaseAgent's `model` stays the (unused) LLM model name
+        self._active = (None, None)
+        # Checkpoints persist the model across restarts ('' disables them). Training runs on
+        # a background worker: it fine-tunes on rows newer than the model's watermark once
+        # FORECAST_MIN_NEW_ROWS have accumulated (or any new rows every
+        # FORECAST_TRAIN_INTERVAL_MINUTES); FORECAST_BACKGROUND_TRAINING=0 trains inline
+        self.model_dir = model_dir if model_dir is not None else os.getenv('FORECAST_MODEL_DIR', 'models/forecast')
+        self.background_training = os.getenv('FORECAST_BACKGROUND_TRAINING', '1') == '1'
+        # Inference runs on the NumPy forward pass by default (FORECAST_RUNTIME=keras serves the
+        # Keras model); FORECAST_TRAINING=0 makes an inference-only process that just follows the
+        # checkpoints another process writes and never imports TensorFlow
+        self.runtime = os.getenv('FORECAST_RUNTIME', 'numpy').lower()
+        # Forecaster served in production: 'lstm' or 'momentum' (the 24h momentum rule, no
+        # training at all); compare them on recorded history with forecast_eval.py
+        self.forecast_model = os.getenv('FORECAST_MODEL', 'lstm').lower()
+        self.training = os.getenv('FORECAST_TRAINING', '1') == '1'
+        self.trainer = ForecastTrainer(
+            self,
+            interval_s=float(os.getenv('FORECAST_TRAIN_INTERVAL_MINUTES', '60')) * 60,
+            poll_s=float(os.getenv('FORECAST_TRAIN_POLL_SECONDS', '60')),
+            min_new_rows=int(os.getenv('FORECAST_MIN_NEW_ROWS', '200')),
+        )
+        # Features materialized incrementally from the CSV (shared by training and inference)
+        # and each symbol's latest normalized window
+        self._feature_store = None
+        self._window_cache = {}
+        # Serve the last published checkpoint from the first cycle after a restart
+        if self.forecast_model != 'momentum' and self.model_dir and \
+                os.path.exists(os.path.join(self.model_dir, 'latest.json')):
+            try:
+                self.trainer.pick_up_checkpoint()
+            except Exception as e:
+                print(f"Error loading forecast checkpoint: {e}")
+
+    @property
+    def forecast_model_obj(self):
+        return self._active[0]
+
+    @property
+    def metadata(self):
+        return self._active[1]
 
-    def _ensure_model(self, input_dim):
-        if self.model is not None:
+    @property
+    def feature_store(self):
+        """Feature store over the current csv_path (recreated if the path changes)"""
+        store = self._feature_store
+        if store is None or store.csv_path != self.csv_path:
+            store = self._feature_store = FeatureStore(self.csv_path, FEATURE_COLS, window=WINDOW)
+        return store
+
+    def publish(self, model, metadata):
+        """Hot-swap the model used for inference (called by the training worker)"""
+        self._active = (model, metadata)
+        print(f"Forecast model v{metadata.get('version')} published "
+              f"(watermark {metadata.get('watermark')}, {metadata.get('trained_rows')} rows)")
+
+    def _refresh_model(self):
+        """Keep the model current without blocking the caller (unless background training is off)"""
+        if not self.csv_path and not self.model_dir:
             return
-        try:
-            # Lazy import to avoid heavy deps if unused
-            from tensorflow import keras
-            from tensorflow.keras import layers
-
-            model = keras.Sequential([
-                layers.Input(shape=(60, input_dim)),
-                layers.LSTM(64, return_sequences=True),
-                layers.Dropout(0.2),
-                layers.LSTM(32),
-                layers.Dense(16, activation='relu'),
-                layers.Dense(1)
-            ])
-            model.compile(optimizer='adam', loss='mse')
-            self.model = model
-        except Exception as e:
-            self.model = None
-
-    def _prepare_sequences(self, df, feature_cols, window=60):
-        data = df[feature_cols].values.astype(float)
-        X, y = [], []
-        for i in range(len(data) - window - 1):
-            X.append(data[i:i+window])
-            # Predict next close return
-            next_close = df['close'].iloc[i+window]
-            cur_close = df['close'].iloc[i+window-1]
-            y.append((next_close - cur_close) / max(cur_close, 1e-6))
-        return np.array(X), np.array(y)
-
-    def _train_model(self, df):
-        feature_cols = ['close', 'volume', 'RSI', 'SMA_20', 'SMA_50', 'MACD', 'MACD_SIGNAL', 'MACD_HIST']
-        df = df.sort_values(['symbol', 'timestamp'])
-        # Train per symbol and average weights (simple approach): use concatenated sequences
-        frames = []
-        for symbol, sdf in df.groupby('symbol'):
-            if len(sdf) < 200:
-                continue
-            Xs, ys = self._prepare_sequences(sdf, feature_cols)
-            if len(Xs) > 0:
-                frames.append((Xs, ys))
-        if not frames:
-            return False
-
-        input_dim = len(feature_cols)
-        self._ensure_model(input_dim)
-        if self.model is None:
-            return False
-
-        X = np.concatenate([f[0] for f in frames], axis=0)
-        y = np.concatenate([f[1] for f in frames], axis=0)
-        # Light training to avoid heavy compute
-        try:
-            self.model.fit(X, y, epochs=2, batch_size=64, verbose=0)
-            return True
-        except Exception:
-            return False
+        if self.background_training:
+            self.trainer.start()
+        else:
+            self.trainer.train_once()
+
+    @staticmethod
+    def _normalize(window, metadata):
+        if not metadata:
+            return window
+        return (window - np.asarray(metadata['norm_mean'])) / np.asarray(metadata['norm_std'])
 
     def _predict_direction(self, market_data, multi_pair):
-        # Fallback: momentum on price_change_24h
-        def fallback(md):
-            change = float(md.get('price_change_24h', 0) or 0)
-            if change > 0.5:
-                return 'buy', 0.6
-            if change < -0.5:
-                return 'sell', 0.6
-            return 'hold', 0.5
-
-        # If no CSV or no model, use fallback
-        if not os.path.exists(self.csv_path) or self.model is None:
+        fallback = self._momentum
+
+        # One consistent (model, metadata) pair for the whole call, even if a new version lands
+        model, metadata = self._active
+
+        # If momentum is selected, or there is no CSV or no model, use fallback
+        if self.forecast_model == 'momentum' or not os.path.exists(self.csv_path) or model is None:
             if multi_pair:
                 out = {}
                 for sym, md in market_data.items():
@@ -93,28 +101,18 @@ class RLForecastAgent(BaseAgent):
             act, conf = fallback(market_data)
             return {'action': act, 'confidence': conf}
 
-        # With a trained model, use the latest window per symbol
+        # With a trained model, score the latest window of every eligible symbol in one batch
         try:
-            df = pd.read_csv(self.csv_path)
-            df = df.dropna()
-            feature_cols = ['close', 'volume', 'RSI', 'SMA_20', 'SMA_50', 'MACD', 'MACD_SIGNAL', 'MACD_HIST']
             if multi_pair:
+                windows = self._latest_windows(list(market_data.keys()), metadata)
+                preds = self._predict_batch(model, windows)
                 out = {}
                 for sym, md in market_data.items():
-                    sdf = df[df['symbol'] == sym].sort_values('timestamp')
-                    if len(sdf) < 61:
+                    if sym in preds:
+                        out[sym] = self._to_forecast(preds[sym])
+                    else:
                         act, conf = fallback(md)
                         out[sym] = {'action': act, 'confidence': conf}
-                        continue
-                    window = sdf[feature_cols].values[-60:]
-                    window = np.expand_dims(window, axis=0)
-                    pred = float(self.model.predict(window, verbose=0)[0][0])
-                    if pred > 0:
-                        out[sym] = {'action': 'buy', 'confidence': min(0.5 + abs(pred), 0.95)}
-                    elif pred < 0:
-                        out[sym] = {'action': 'sell', 'confidence': min(0.5 + abs(pred), 0.95)}
-                    else:
-                        out[sym] = {'action': 'hold', 'confidence': 0.5}
                 return out
             # single pair
             sym = list(market_data.keys())[0] if isinstance(market_data, dict) and 'close' not in market_data else None
@@ -123,18 +121,11 @@ class RLForecastAgent(BaseAgent):
                 # no symbol label, just use fallback
                 act, conf = fallback(market_data)
                 return {'action': act, 'confidence': conf}
-            sdf = df[df['symbol'] == sym].sort_values('timestamp')
-            if len(sdf) < 61:
+            preds = self._predict_batch(model, self._latest_windows([sym], metadata))
+            if sym not in preds:
                 act, conf = fallback(market_data[sym])
                 return {'action': act, 'confidence': conf}
-            window = sdf[feature_cols].values[-60:]
-            window = np.expand_dims(window, axis=0)
-            pred = float(self.model.predict(window, verbose=0)[0][0])
-            if pred > 0:
-                return {'action': 'buy', 'confidence': min(0.5 + abs(pred), 0.95)}
-            if pred < 0:
-                return {'action': 'sell', 'confidence': min(0.5 + abs(pred), 0.95)}
-            return {'action': 'hold', 'confidence': 0.5}
+            return self._to_forecast(preds[sym])
         except Exception:
             # robust fallback
             if multi_pair:
@@ -146,15 +137,65 @@ class RLForecastAgent(BaseAgent):
             act, conf = fallback(market_data)
             return {'action': act, 'confidence': conf}
 
+    @staticmethod
+    def _momentum(md):
+        """Fallback: momentum on price_change_24h"""
+        change = float(md.get('price_change_24h', 0) or 0)
+        if change > 0.5:
+            return 'buy', 0.6
+        if change < -0.5:
+            return 'sell', 0.6
+        return 'hold', 0.5
+
+    @staticmethod
+    def _to_forecast(pred):
+        if pred > 0:
+            return {'action': 'buy', 'confidence': min(0.5 + abs(pred), 0.95)}
+        if pred < 0:
+            return {'action': 'sell', 'confidence': min(0.5 + abs(pred), 0.95)}
+        return {'action': 'hold', 'confidence': 0.5}
+
+    def _latest_windows(self, symbols, metadata):
+        """
+        Normalized latest window per symbol with at least WINDOW + 1 stored rows.
+        Windows are cached per symbol and rebuilt only when that symbol has a newer row
+        or the model (and so its normalization) changed
+        """
+        store = self.feature_store
+        store.refresh()
+        version = (metadata or {}).get('version')
+        windows = {}
+        for sym in symbols:
+            if store.symbol_rows(sym) < WINDOW + 1:
+                continue
+            latest = store.latest(sym)
+            if latest is None:
+                continue
+            key = (version, latest[0])
+            cached = self._window_cache.get(sym)
+            if cached is None or cached[0] != key:
+                cached = (key, self._normalize(latest[1], metadata))
+                self._window_cache[sym] = cached
+            windows[sym] = cached[1]
+        return windows
+
+    @staticmethod
+    def _predict_batch(model, windows):
+        """One forward pass over all symbol windows; returns {symbol: predicted return}"""
+        if not windows:
+            return {}
+        symbols = list(windows)
+        batch = np.stack([windows[sym] for sym in symbols])
+        preds = np.asarray(model.predict_on_batch(batch)).reshape(len(symbols), -1)[:, 0]
+        return dict(zip(symbols, preds.astype(float).tolist()))
+
     def get_response(self, market_data, multi_pair=False):
-        # Train model from CSV if possible (once per process)
-        if self.model is None and os.path.exists(self.csv_path):
+        # Start (or run) the training worker; until a model is published the fallback is served
+        if self.forecast_model != 'momentum':
             try:
-                df = pd.read_csv(self.csv_path)
-                if not df.empty:
-                    self._train_model(df)
-            except Exception:
-                pass
+                self._refresh_model()
+            except Exception as e:
+                print(f"Error refreshing forecast model: {e}")
 
         forecast = self._predict_direction(market_data, multi_pair)
         if multi_pair:
@@ -165,3 +206,17 @@ class RLForecastAgent(BaseAgent):
         return f"RL Forecast: {forecast['action'].upper()} (confidence {forecast['confidence']:.2f})"
 
 
+_shared = {}  # csv_path -> RLForecastAgent
+_shared_lock = threading.Lock()
+
+
+def get_forecast_agent(csv_path='market_data.csv'):
+    """
+    Return the process-wide forecaster for this CSV, creating it on first use. Every
+    TradingSystem in the process (API, Streamlit sessions, resets) shares its feature
+    store and training worker, so a process runs at most one trainer per CSV.
+    """
+    with _shared_lock:
+        if csv_path not in _shared:
+            _shared[csv_path] = RLForecastAgent(csv_path=csv_path)
+        return _shared[csv_path]
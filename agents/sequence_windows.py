@@ -0,0 +1,81 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class WindowSet:
+    """
+    Fixed-length training windows over many symbols without copying them.
+
+    All symbols' feature rows live in one contiguous array (grouped by symbol, in
+    time order). Windows are strided views into it and a sample is just the row
+    offset of its first step, so nothing is copied until take() gathers a batch.
+    The label of a window is the next close-to-close return after its last step.
+    """
+
+    def __init__(self, data, close, symbol_ranges, window=60):
+        self.window = window
+        self.data = np.ascontiguousarray(data, dtype=np.float64)
+        self.symbol_ranges = symbol_ranges  # symbol -> (first_row, end_row)
+        n_rows = len(self.data)
+
+        # (n_rows - window + 1, window, n_features) view; no data is copied
+        if n_rows >= window:
+            self._windows = sliding_window_view(self.data, window, axis=0).transpose(0, 2, 1)
+        else:
+            self._windows = np.empty((0, window, self.data.shape[1]))
+
+        # Next-step return for every row: label of the window ending at row r is returns[r]
+        close = np.asarray(close, dtype=np.float64)
+        self.returns = np.full(n_rows, np.nan)
+        if n_rows > 1:
+            prev = close[:-1]
+            self.returns[:-1] = (close[1:] - prev) / np.maximum(prev, 1e-6)
+
+        # Window start offsets that stay inside one symbol and have a label
+        starts = [
+            np.arange(first, end - window - 1)
+            for first, end in symbol_ranges.values()
+            if end - first > window + 1
+        ]
+        self.starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, df, feature_cols, window=60, min_rows=0, symbol_col='symbol', time_col='timestamp',
+                   normalize=None):
+        """
+        Build from a long-format frame with one row per (symbol, timestamp).
+        normalize=(mean, std) standardizes the features (labels always use the raw close)
+        """
+        df = df.sort_values([symbol_col, time_col], kind='stable')
+        counts = df.groupby(symbol_col, sort=False).size()
+        keep = counts[counts >= max(min_rows, 1)].index
+        df = df[df[symbol_col].isin(keep)]
+        symbols = df[symbol_col].to_numpy()
+        ranges = {}
+        if len(symbols):
+            # Rows are grouped by symbol, so each symbol is one contiguous slice
+            boundaries = np.flatnonzero(symbols[1:] != symbols[:-1]) + 1
+            firsts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(symbols)]))
+            ranges = {symbols[f]: (int(f), int(e)) for f, e in zip(firsts, ends)}
+        data = df[feature_cols].to_numpy(dtype=np.float64)
+        if normalize is not None:
+            mean, std = normalize
+            data = (data - np.asarray(mean)) / np.asarray(std)
+        return cls(data, df['close'].to_numpy(dtype=np.float64), ranges, window=window)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def take(self, index=None):
+        """Gather (X, y) for the given sample indices (all samples by default); this copies"""
+        starts = self.starts if index is None else self.starts[index]
+        return self._windows[starts], self.returns[starts + self.window - 1]
+
+    def batches(self, batch_size=64, shuffle=True, seed=None):
+        """Yield (X, y) batches, gathering each batch only when it is needed"""
+        order = np.arange(len(self.starts))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for i in range(0, len(order), batch_size):
+            yield self.take(order[i:i + batch_size])
@@ -0,0 +1,119 @@
+import json
+import math
+
+
+# Appended to the trader's instructions so every plan ends with machine-readable signals
+SIGNAL_FORMAT_INSTRUCTIONS = """
+After your analysis, list every trade you recommend as JSON in exactly this shape:
+```json
+{"signals": [{"symbol": "BTCUSDT", "action": "buy", "entry_price": 64250.5, "confidence": 0.7, "reason": "short rationale"}]}
+```
+action is "buy" or "sell"; entry_price is a plain number in USDT. Use {"signals": []} when there is no trade."""
+
+VALID_ACTIONS = ('buy', 'sell')
+
+
+def validate_signal(obj):
+    """Normalize a decoded signal object, or return None if it is not a usable signal"""
+    if not isinstance(obj, dict):
+        return None
+    symbol = str(obj.get('symbol') or '').strip().upper()
+    action = str(obj.get('action') or '').strip().lower()
+    try:
+        entry_price = float(str(obj.get('entry_price')).replace('$', '').replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+    if not symbol or action not in VALID_ACTIONS or not math.isfinite(entry_price) or entry_price <= 0:
+        return None
+    signal = {'symbol': symbol, 'action': action, 'entry_price': entry_price}
+    try:
+        signal['confidence'] = float(obj['confidence'])
+    except (KeyError, TypeError, ValueError):
+        pass
+    if obj.get('reason'):
+        signal['reason'] = str(obj['reason'])
+    return signal
+
+
+class SignalStreamParser:
+    """
+    Incremental parser for trader signals in streamed text.
+
+    feed() accepts text deltas of any size and returns the signals whose JSON object
+    closed within that delta (on_signal, if given, is called for each as well), so a
+    signal can be acted on before the rest of the completion arrives. Prose and code
+    fences around the JSON are skipped; objects that look like signals but fail
+    validation are reported and dropped.
+    """
+
+    def __init__(self, on_signal=None):
+        self.on_signal = on_signal
+        self.signals = []
+        self._buffer = []
+        self._starts = []  # buffer offsets of the currently open '{'
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text):
+        found = []
+        for ch in text or '':
+            if not self._starts:
+                if ch == '{':
+                    self._buffer = ['{']
+                    self._starts = [0]
+                continue
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._starts.append(len(self._buffer) - 1)
+            elif ch == '}':
+                start = self._starts.pop()
+                signal = self._decode(''.join(self._buffer[start:]))
+                if signal is not None:
+                    found.append(signal)
+                if not self._starts:
+                    self._buffer = []
+        for signal in found:
+            self.signals.append(signal)
+            if self.on_signal:
+                self.on_signal(signal)
+        return found
+
+    @staticmethod
+    def _decode(text):
+        try:
+            obj = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(obj, dict) or 'symbol' not in obj:
+            return None
+        signal = validate_signal(obj)
+        if signal is None:
+            print(f"Ignoring malformed trade signal: {text[:200]}")
+        return signal
+
+
+def parse_signals(text):
+    """All valid signals in a complete response"""
+    parser = SignalStreamParser()
+    parser.feed(text)
+    return parser.signals
+
+
+def tee_signals(on_token, on_signal):
+    """Delta callback that forwards to on_token (if any) and parses signals on the fly"""
+    parser = SignalStreamParser(on_signal)
+
+    def feed(delta):
+        if on_token:
+            on_token(delta)
+        parser.feed(delta)
+    return feed
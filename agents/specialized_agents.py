@@ -1,6 +1,8 @@
-import json
 from langchain.schema import SystemMessage
 from .base_agent import BaseAgent
+from .fanout import run_concurrently
+from .market_context import MarketContext
+from .signal_parser import SIGNAL_FORMAT_INSTRUCTIONS
 
 
 # ============================
@@ -10,28 +12,18 @@ from .base_agent import BaseAgent
 class TraderAgent(BaseAgent):
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        self.system_message = SystemMessage(content="""You are an expert cryptocurrency trader...""")
+        self.system_message = SystemMessage(content="""You are an expert cryptocurrency trader...""" + SIGNAL_FORMAT_INSTRUCTIONS)
 
-    def get_trade_from_consensus(self, consensus_summary: str, market_data: dict, multi_pair: bool = False) -> str:
+    def get_trade_from_consensus(self, consensus_summary: str, market_data, multi_pair: bool = False,
+                                 on_token=None) -> str:
         """
-        Generate a trading plan using consensus summary and market data.
+        Generate a trading plan using consensus summary and market data
+        (a raw market data dict or a shared MarketContext). Streams through on_token if given.
         """
         consensus_section = f"<CONSENSUS_SUMMARY>\n{consensus_summary}\n</CONSENSUS_SUMMARY>"
 
-        # Format market data
-        if not multi_pair:
-            formatted_data = {
-                "price_data": {k: float(market_data.get(k, 0)) for k in ["close", "open", "high", "low", "volume"]},
-                "indicators": {k: float(market_data.get(k, 0)) for k in ["RSI", "SMA_20", "SMA_50", "MACD", "MACD_SIGNAL", "MACD_HIST", "price_change_24h"]},
-            }
-        else:
-            formatted_data = {
-                symbol: {
-                    "price_data": {k: float(data.get(k, 0)) for k in ["close", "open", "high", "low", "volume"]},
-                    "indicators": {k: float(data.get(k, 0)) for k in ["RSI", "SMA_20", "SMA_50", "MACD", "MACD_SIGNAL", "MACD_HIST", "price_change_24h"]},
-                }
-                for symbol, data in market_data.items()
-            }
+        # Compact CSV-style market table, cached on the context
+        formatted_data = MarketContext.coerce(market_data, multi_pair=multi_pair).table
 
         prompt = f"""
 {self.system_message.content}
@@ -39,12 +31,12 @@ class TraderAgent(BaseAgent):
 Use the following consensus summary to refine your final trading plan.
 {consensus_section}
 
-Current Market Data:
-{json.dumps(formatted_data, indent=2)}
+Current Market Data (CSV):
+{formatted_data}
 
 Provide the final consensus-driven trading plan now.
 """
-        return self.get_response(prompt)
+        return self.respond(prompt, on_token)
 
 
 class RiskAdvisorAgent(BaseAgent):
@@ -100,10 +92,14 @@ class ConsensusAdvisorAgent(BaseAgent):
         super().__init__(api_key)
         self.system_message = SystemMessage(content="""You are a market synthesizer...""")
 
-    def get_consensus(self, analyses: dict) -> str:
+    def get_consensus(self, analyses: dict, on_token=None, missing: dict = None, compact: bool = False) -> str:
         """
-        Generate a consensus view from multiple analyses.
+        Generate a consensus view from multiple analyses. Streams through on_token if given.
+        Analyses listed in `missing` (name -> reason) did not arrive in time; they are
+        marked as missing so the synthesis proceeds with the ones that completed.
+        compact=True asks for a short per-symbol summary (used for sharded analysis).
         """
+        missing = missing if missing is not None else getattr(analyses, "missing", {})
         ordered_keys = [
             "Trader's Analysis", "Risk Assessment", "Technical Analysis", "Financial Analysis",
             "Market Sentiment", "Macro Environment", "On-Chain Metrics",
@@ -114,11 +110,37 @@ class ConsensusAdvisorAgent(BaseAgent):
                 ordered_keys.append(key)
 
         prompt = "Synthesize the following analyses into a unified trading view:\n\n"
+        if missing:
+            prompt += (f"Note: {len(missing)} of {len(analyses)} analyses are missing for this cycle. "
+                       "Base the view on the available ones and lower your confidence accordingly.\n\n")
         for key in ordered_keys:
-            if key in analyses:
+            if key in missing:
+                prompt += f"=== {key.upper()} ===\n[MISSING: {missing[key]}]\n\n"
+            elif key in analyses:
                 prompt += f"=== {key.upper()} ===\n{analyses[key]}\n\n"
 
-        return self.get_response(prompt)
+        if compact:
+            prompt += ("Keep it under 150 words: one line per symbol worth acting on "
+                       "(symbol, buy/sell/hold, confidence, key reason), then one line of overall bias.\n")
+            return self.respond(prompt, on_token, max_tokens=400)
+        return self.respond(prompt, on_token)
+
+    def reduce_shards(self, shard_summaries: dict, on_token=None, missing: dict = None) -> str:
+        """
+        Merge compact per-shard consensus summaries (shard name -> summary) into one
+        trading view across the whole universe. Shards in `missing` are noted as absent.
+        """
+        missing = missing or {}
+        prompt = "Merge these per-group consensus summaries into one unified trading view across all symbols:\n\n"
+        if missing:
+            prompt += (f"Note: {len(missing)} symbol groups are missing for this cycle; "
+                       "do not recommend trades in them.\n\n")
+        for shard, summary in shard_summaries.items():
+            prompt += f"=== {shard.upper()} ===\n{summary}\n\n"
+        for shard, reason in missing.items():
+            prompt += f"=== {shard.upper()} ===\n[MISSING: {reason}]\n\n"
+        prompt += "Rank the best opportunities across groups and state the overall market bias.\n"
+        return self.respond(prompt, on_token)
 
 
 # ============================
@@ -131,7 +153,10 @@ class MarketOrchestrator:
     and produces a consensus-driven final trading plan.
     """
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, max_concurrency: int = 9, agent_timeout: float = None, quorum: int = None):
+        self.max_concurrency = max_concurrency
+        self.agent_timeout = agent_timeout
+        self.quorum = quorum
         self.trader = TraderAgent(api_key)
         self.risk = RiskAdvisorAgent(api_key)
         self.graph = GraphAnalystAgent(api_key)
@@ -142,25 +167,37 @@ class MarketOrchestrator:
         self.liquidity = LiquidityAnalysisAgent(api_key)
         self.correlation = CorrelationAnalysisAgent(api_key)
         self.consensus = ConsensusAdvisorAgent(api_key)
+        for agent in (self.trader, self.risk, self.graph, self.financial, self.sentiment, self.macro,
+                      self.onchain, self.liquidity, self.correlation, self.consensus):
+            agent.timeout_s = agent_timeout
 
-    def run_all(self, market_data: dict, multi_pair: bool = False) -> str:
+    def run_all(self, market_data, multi_pair: bool = False) -> str:
         """
         Runs all agents and returns the final consensus trading plan.
+        Accepts a raw market data dict or a shared MarketContext.
         """
-        analyses = {
-            "Trader's Analysis": self.trader.get_response(json.dumps(market_data)),
-            "Risk Assessment": self.risk.get_response(json.dumps(market_data)),
-            "Technical Analysis": self.graph.get_response(json.dumps(market_data)),
-            "Financial Analysis": self.financial.get_response(json.dumps(market_data)),
-            "Market Sentiment": self.sentiment.get_response(json.dumps(market_data)),
-            "Macro Environment": self.macro.get_response(json.dumps(market_data)),
-            "On-Chain Metrics": self.onchain.get_response(json.dumps(market_data)),
-            "Liquidity Analysis": self.liquidity.get_response(json.dumps(market_data)),
-            "Correlation Analysis": self.correlation.get_response(json.dumps(market_data)),
+        context = MarketContext.coerce(market_data, multi_pair=multi_pair)
+        payload = context.table
+        analysts = {
+            "Trader's Analysis": self.trader,
+            "Risk Assessment": self.risk,
+            "Technical Analysis": self.graph,
+            "Financial Analysis": self.financial,
+            "Market Sentiment": self.sentiment,
+            "Macro Environment": self.macro,
+            "On-Chain Metrics": self.onchain,
+            "Liquidity Analysis": self.liquidity,
+            "Correlation Analysis": self.correlation,
         }
+        analyses = run_concurrently(
+            {name: (lambda agent=agent: agent.get_response(payload)) for name, agent in analysts.items()},
+            max_workers=self.max_concurrency,
+            timeout=self.agent_timeout,
+            quorum=self.quorum,
+        )
 
         # Get consensus summary
         consensus_summary = self.consensus.get_consensus(analyses)
 
         # Get final trading plan from TraderAgent
-        return self.trader.get_trade_from_consensus(consensus_summary, market_data, multi_pair=multi_pair)
+        return self.trader.get_trade_from_consensus(consensus_summary, context, multi_pair=multi_pair)
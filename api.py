@@ -1,12 +1,19 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 import uvicorn
 from trading_system import TradingSystem
+from agents.metrics import agent_metrics
+from agents.response_cache import default_cache
 import asyncio
+import functools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 app = FastAPI(title="Trading System API")
@@ -30,6 +37,20 @@ async def get_ui():
 # Initialize trading system
 trading_system = TradingSystem(initial_balance_usd=100.0, auto_buy_btc=True)
 
+# TradingSystem calls block (Binance REST, LLM cycles), so routes run them on bounded
+# executors instead of the event loop: API_IO_WORKERS threads for quick exchange calls,
+# and a separate API_ANALYSIS_WORKERS pool for agent cycles so a minutes-long analysis
+# can never take the threads /wallet or /market/overview need
+io_executor = ThreadPoolExecutor(max_workers=int(os.getenv('API_IO_WORKERS', '8')),
+                                 thread_name_prefix="api-io")
+analysis_executor = ThreadPoolExecutor(max_workers=int(os.getenv('API_ANALYSIS_WORKERS', '1')),
+                                       thread_name_prefix="api-analysis")
+
+async def run_blocking(executor, fn, *args, **kwargs):
+    """Run a blocking call on an executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
 # Pydantic models for request/response
 class Trade(BaseModel):
     symbol: str
@@ -61,10 +82,113 @@ class AgentAnalysis(BaseModel):
     technical_analysis: str
     financial_analysis: str
 
+class LatestAnalysis(AgentAnalysis):
+    age_seconds: float
+    refreshing: bool
+
 # Store recent analyses
 recent_analyses: List[AgentAnalysis] = []
 max_analyses = 50  # Maximum number of analyses to store
 
+# /analysis/latest serves the newest completed analysis (from any source) while it is
+# younger than ANALYSIS_MAX_AGE_SECONDS; a stale one is still served while a single
+# shared refresh runs, and callers only wait when there is no analysis at all
+analysis_max_age = float(os.getenv('ANALYSIS_MAX_AGE_SECONDS', '300'))
+latest_analysis = None  # (AgentAnalysis, completed_at monotonic)
+# In-flight cycles by symbol (None = all pairs). /analysis/latest refreshes,
+# /analysis/stream connections and the autonomous loop join the running cycle instead
+# of starting another, so they never place duplicate trades. A finished cycle is
+# dropped, and only known trading pairs get a key
+analysis_cycles = {}
+trading_pairs = set(trading_system.MAJOR_COINS + trading_system.MEME_COINS)
+
+def record_analysis(analysis):
+    """Convert an analyze_market result to AgentAnalysis and keep it in the history"""
+    agent_analysis = AgentAnalysis(
+        timestamp=datetime.now(),
+        trader_analysis=analysis["Trader's Analysis"],
+        risk_analysis=analysis["Risk Assessment"],
+        technical_analysis=analysis["Technical Analysis"],
+        financial_analysis=analysis["Financial Analysis"]
+    )
+    
+    recent_analyses.append(agent_analysis)
+    if len(recent_analyses) > max_analyses:
+        recent_analyses.pop(0)
+    global latest_analysis
+    latest_analysis = (agent_analysis, time.monotonic())
+    return agent_analysis
+
+class AnalysisCycle:
+    """
+    One analyze_market run on the analysis executor. Token events are kept so a
+    subscriber that joins late replays them before following the live ones.
+    changed_only runs the autonomous loop's analyze_if_changed instead, which covers
+    only the symbols that moved; its result is not recorded as the latest analysis.
+    """
+
+    def __init__(self, symbol=None, changed_only=False):
+        self.symbol = symbol
+        self.changed_only = changed_only
+        self.events = []  # (section_name, delta); the last one is (None, result)
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    def _push(self, event):
+        self.events.append(event)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        on_token = lambda name, delta: loop.call_soon_threadsafe(self._push, (name, delta))
+        try:
+            if self.changed_only:
+                result, _ = await run_blocking(analysis_executor, trading_system.analyze_if_changed,
+                                               on_token=on_token)
+                if result is None:
+                    result = "No material market changes"
+            else:
+                result = await run_blocking(analysis_executor, trading_system.analyze_market,
+                                            self.symbol, on_token=on_token)
+            if isinstance(result, dict) and self.full:
+                record_analysis(result)
+        except Exception as e:
+            print(f"Error in analysis cycle: {e}")
+            result = f"Error in market analysis: {str(e)}"
+        self._push((None, result))
+        return result
+
+    @property
+    def full(self):
+        """True for an all-pairs analysis of the whole universe"""
+        return self.symbol is None and not self.changed_only
+
+    async def subscribe(self):
+        """Yield every event of the cycle from the start, ending with (None, result)"""
+        seen = 0
+        while True:
+            while seen < len(self.events):
+                event = self.events[seen]
+                seen += 1
+                yield event
+                if event[0] is None:
+                    return
+            await self._changed.wait()
+
+def ensure_analysis_cycle(symbol=None, changed_only=False):
+    """Start a cycle for the symbol unless one is already running; returns the shared cycle"""
+    cycle = analysis_cycles.get(symbol)
+    if cycle is None or cycle.task.done():
+        cycle = analysis_cycles[symbol] = AnalysisCycle(symbol, changed_only)
+
+        def finished(task):
+            # Subscribers still streaming keep their own reference to the cycle
+            if analysis_cycles.get(symbol) is cycle:
+                del analysis_cycles[symbol]
+        cycle.task.add_done_callback(finished)
+    return cycle
+
 @app.get("/")
 async def root():
     return {"message": "Trading System API is running"}
@@ -73,7 +197,7 @@ async def root():
 async def get_wallet_info():
     """Get current wallet information"""
     try:
-        wallet_summary = trading_system.get_wallet_summary()
+        wallet_summary = await run_blocking(io_executor, trading_system.get_wallet_summary)
         return wallet_summary
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -82,7 +206,7 @@ async def get_wallet_info():
 async def get_market_overview():
     """Get overview of all trading pairs"""
     try:
-        overview = trading_system.get_market_overview()
+        overview = await run_blocking(io_executor, trading_system.get_market_overview)
         return overview
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -91,7 +215,7 @@ async def get_market_overview():
 async def get_market_data(symbol: str):
     """Get detailed market data for a specific symbol"""
     try:
-        data = trading_system.get_market_data(symbol)
+        data = await run_blocking(io_executor, trading_system.get_market_data, symbol)
         if data is None:
             raise HTTPException(status_code=404, detail=f"No data found for {symbol}")
         return data
@@ -102,77 +226,107 @@ async def get_market_data(symbol: str):
 async def execute_trade(trade: Trade):
     """Execute a trade"""
     try:
-        result = trading_system.execute_trade(trade.symbol, trade.side, trade.amount)
+        result = await run_blocking(io_executor, trading_system.execute_trade, trade.symbol, trade.side, trade.amount)
         return {"status": "success", "order": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/analysis/latest")
+@app.get("/analysis/latest", response_model=LatestAnalysis)
 async def get_latest_analysis():
-    """Get the most recent market analysis"""
+    """Get the most recent market analysis and its age, refreshing it once when stale"""
     try:
-        analysis = trading_system.analyze_market()
-        current_time = datetime.now()
-        
-        agent_analysis = AgentAnalysis(
-            timestamp=current_time,
-            trader_analysis=analysis["Trader's Analysis"],
-            risk_analysis=analysis["Risk Assessment"],
-            technical_analysis=analysis["Technical Analysis"],
-            financial_analysis=analysis["Financial Analysis"]
-        )
-        
-        # Store the analysis
-        recent_analyses.append(agent_analysis)
-        if len(recent_analyses) > max_analyses:
-            recent_analyses.pop(0)
-            
-        return agent_analysis
+        current = latest_analysis
+        if current is None or time.monotonic() - current[1] > analysis_max_age:
+            refresh = ensure_analysis_cycle()
+            if current is None:
+                # shield: a disconnecting caller must not cancel the cycle others wait on
+                await asyncio.shield(refresh.task)
+                if not refresh.full:
+                    # The autonomous loop's change-only cycle was running; wait for a full one
+                    await asyncio.shield(ensure_analysis_cycle().task)
+                current = latest_analysis
+                if current is None:
+                    raise HTTPException(status_code=503, detail="No completed analysis yet")
+        cycle = analysis_cycles.get(None)
+        refreshing = cycle is not None and not cycle.task.done()
+        analysis, completed_at = current
+        return LatestAnalysis(**dict(analysis), age_seconds=time.monotonic() - completed_at,
+                              refreshing=refreshing)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/analysis/stream")
+async def stream_analysis(symbol: Optional[str] = None):
+    """Stream a market analysis as server-sent events while each agent's tokens arrive"""
+    if symbol and symbol not in trading_pairs:
+        raise HTTPException(status_code=404, detail=f"Unknown trading pair {symbol}")
+    # Joins the cycle already running for this symbol, if any; disconnecting only
+    # stops this subscriber, the cycle itself runs to completion
+    cycle = ensure_analysis_cycle(symbol)
+
+    async def events():
+        async for agent, payload in cycle.subscribe():
+            if agent is not None:
+                yield f"data: {json.dumps({'agent': agent, 'delta': payload})}\n\n"
+                continue
+            # Final event carries the aggregated analyses
+            if isinstance(payload, dict):
+                yield f"event: done\ndata: {json.dumps({'analysis': payload})}\n\n"
+            else:
+                yield f"event: error\ndata: {json.dumps({'detail': str(payload)})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.get("/analysis/history")
 async def get_analysis_history():
     """Get historical market analyses"""
     return recent_analyses
 
+@app.get("/metrics/agents")
+async def get_agent_metrics():
+    """Per-agent LLM latency percentiles, token usage, errors and cache hits"""
+    return {
+        "agents": agent_metrics.snapshot(),
+        "cache": default_cache.stats(),
+        "last_cycle_prompt_tokens": trading_system.last_prompt_tokens,
+        "execution": trading_system.execution_worker.stats(),
+    }
+
 @app.get("/trades/history")
 async def get_trade_history():
     """Get trading history"""
     try:
-        return trading_system.wallet.trade_history
+        return list(trading_system.wallet.trade_history)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Background task for autonomous trading
+market_poll_interval = int(os.getenv('MARKET_POLL_SECONDS', '60'))
+
 async def autonomous_trading():
+    # Poll cheap market data often; run the agents only for symbols that changed
+    # materially (the change detector's heartbeat still re-analyzes quiet symbols).
+    # An all-pairs cycle already running (a refresh or a stream) counts as this poll
     while True:
         try:
-            analysis = trading_system.analyze_market()
-            current_time = datetime.now()
-            
-            # Store the analysis
-            agent_analysis = AgentAnalysis(
-                timestamp=current_time,
-                trader_analysis=analysis["Trader's Analysis"],
-                risk_analysis=analysis["Risk Assessment"],
-                technical_analysis=analysis["Technical Analysis"],
-                financial_analysis=analysis["Financial Analysis"]
-            )
-            
-            recent_analyses.append(agent_analysis)
-            if len(recent_analyses) > max_analyses:
-                recent_analyses.pop(0)
-                
+            await asyncio.shield(ensure_analysis_cycle(changed_only=True).task)
         except Exception as e:
             print(f"Error in autonomous trading: {e}")
             
-        await asyncio.sleep(300)  # 5-minute interval
+        await asyncio.sleep(market_poll_interval)
 
 @app.on_event("startup")
 async def startup_event():
     """Start autonomous trading on server startup"""
     asyncio.create_task(autonomous_trading())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    trading_system.close()
+    io_executor.shutdown(wait=False, cancel_futures=True)
+    analysis_executor.shutdown(wait=False, cancel_futures=True)
+
 if __name__ == "__main__":
     uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,169 @@
+import queue
+import threading
+import time
+from collections import deque
+
+
+class SignalBus:
+    """
+    Queue of trade signals between the agents that produce them and the execution
+    worker. Each published signal is stamped with the time it was queued.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def publish(self, signal):
+        signal = dict(signal, queued_at=time.monotonic())
+        self._queue.put(signal)
+        return signal
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+    def task_done(self):
+        self._queue.task_done()
+
+    def join(self):
+        """Block until every published signal has been handled"""
+        self._queue.join()
+
+    def pending(self):
+        return self._queue.qsize()
+
+
+class SignalSink:
+    """
+    Per-cycle entry point for signals parsed from the trader's stream. Each (symbol, action)
+    is submitted at most once, and only for symbols the cycle analyzed. Once closed (the
+    cycle returned, or the trader call feeding a branch timed out or lost to its hedge),
+    signals that a still-running stream parses are dropped instead of placing orders.
+    """
+
+    def __init__(self, submit, symbols=None):
+        self.submit = submit
+        self.symbols = set(symbols) if symbols is not None else None
+        self.closed = False
+        self.dropped = 0
+        self._handled = set()
+        self._lock = threading.Lock()
+
+    def branch(self):
+        """Sink for a single producer that can be closed on its own; it forwards to this one"""
+        return SignalSink(self)
+
+    def close(self):
+        """Stop accepting signals; waits for a submission already in progress"""
+        with self._lock:
+            self.closed = True
+
+    def __call__(self, signal):
+        symbol = signal['symbol']
+        # Held while submitting, so nothing is submitted once close() has returned
+        with self._lock:
+            if self.closed:
+                self.dropped += 1
+                print(f"Dropping late {signal['action']} signal for {symbol}: its analysis is over")
+                return
+            key = (symbol, signal['action'])
+            if key in self._handled:
+                return
+            self._handled.add(key)
+            if self.symbols is not None and symbol not in self.symbols:
+                print(f"Ignoring signal for {symbol}: not in this cycle's market data")
+                return
+            try:
+                self.submit(signal)
+            except Exception as e:
+                print(f"Error executing signal for {symbol}: {e}")
+
+
+class ExecutionWorker:
+    """
+    Background consumer of the signal bus. Each signal is re-priced against the latest
+    ticker when it is taken off the queue: signals older than max_age_s, or whose entry
+    price is now more than tolerance away from the market, are dropped as stale.
+    Signal-to-fill latency is therefore independent of how long the analysis runs.
+    """
+
+    def __init__(self, trading_system, bus, tolerance=0.01, max_age_s=120.0, window=200):
+        self.trading_system = trading_system
+        self.bus = bus
+        self.tolerance = tolerance
+        self.max_age_s = max_age_s
+        self.counts = {'received': 0, 'filled': 0, 'skipped': 0, 'stale': 0, 'errors': 0}
+        self.fill_latency = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="execution-worker", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop the worker after the signal it is handling; signals still queued are not executed"""
+        self._stop.set()
+        with self._lock:
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def submit(self, signal):
+        """Queue a signal for execution, starting the worker on first use"""
+        self.start()
+        self.bus.publish(signal)
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                signal = self.bus.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._handle(signal)
+            except Exception as e:
+                self._count('errors')
+                print(f"Error executing signal for {signal.get('symbol')}: {e}")
+            finally:
+                self.bus.task_done()
+
+    def _handle(self, signal):
+        self._count('received')
+        symbol = signal['symbol']
+        age = time.monotonic() - signal['queued_at']
+        if age > self.max_age_s:
+            self._count('stale')
+            print(f"Dropping stale {signal['action']} signal for {symbol} ({age:.0f}s old)")
+            return
+
+        ticker = self.trading_system.client.get_symbol_ticker(symbol=symbol)
+        current_price = float(ticker['price'])
+        drift = abs(current_price - signal['entry_price']) / signal['entry_price']
+        if drift > self.tolerance:
+            self._count('stale')
+            print(f"Dropping {signal['action']} signal for {symbol}: price moved {drift:.2%} from entry")
+            return
+
+        if self.trading_system.place_signal_order(signal, current_price):
+            self._count('filled')
+            with self._lock:
+                self.fill_latency.append(time.monotonic() - signal['queued_at'])
+        else:
+            self._count('skipped')
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self.fill_latency)
+            counts = dict(self.counts)
+        counts['pending'] = self.bus.pending()
+        counts['fill_latency_p50'] = latencies[len(latencies) // 2] if latencies else None
+        counts['fill_latency_max'] = latencies[-1] if latencies else None
+        return counts
@@ -0,0 +1,256 @@
+"""
+Walk-forward evaluation of the forecaster.
+
+Splits a recorded history (the CSV written by TradingSystem.save_all_market_data_csv)
+into rolling folds by timestamp. Each fold trains the LSTM on the history up to its
+cut-off and tests on the following period, in its own worker process. The report
+compares the LSTM with the price_change_24h momentum fallback: directional accuracy,
+coverage (share of non-hold calls), calibration of the reported confidence, and the
+training and inference time per fold. The recommendation maps to FORECAST_MODEL.
+
+Usage:
+    python forecast_eval.py market_data.csv --folds 4 --workers 4 --json eval.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from agents.forecast_checkpoint import normalization_stats
+from agents.forecast_trainer import FEATURE_COLS, WINDOW, build_model, window_dataset
+from agents.lstm_runtime import NumpyLSTMModel
+from agents.rl_agent import RLForecastAgent
+from agents.sequence_windows import WindowSet
+
+
+CALIBRATION_BINS = [0.5, 0.55, 0.6, 0.7, 0.8, 0.95]
+
+_history = {}  # per worker process: csv_path -> cleaned history frame
+
+
+def load_history(csv_path):
+    """History sorted per symbol, without rows whose features are missing (as the feature store does)"""
+    if csv_path not in _history:
+        df = pd.read_csv(csv_path, usecols=['timestamp', 'symbol', 'price_change_24h'] + FEATURE_COLS)
+        df = df.dropna(subset=FEATURE_COLS).sort_values(['symbol', 'timestamp'], kind='stable')
+        _history[csv_path] = df.reset_index(drop=True)
+    return _history[csv_path]
+
+
+def fold_boundaries(timestamps, folds, initial_train=0.5, train_window=None):
+    """[(train_start, train_end, test_end)] over sorted unique timestamps; train_start None = expanding"""
+    timestamps = np.unique(timestamps)
+    first_test = int(len(timestamps) * initial_train)
+    edges = np.linspace(first_test, len(timestamps), folds + 1).astype(int)
+    out = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi <= lo:
+            continue
+        train_start = None
+        if train_window and lo - train_window > 0:
+            train_start = int(timestamps[lo - train_window - 1])
+        out.append((train_start, int(timestamps[lo - 1]), int(timestamps[hi - 1])))
+    return out
+
+
+def _init_worker(threads):
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+    try:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except Exception as e:
+        print(f"Could not limit TensorFlow threads: {e}")
+
+
+def _fold_windows(df, normalize):
+    windows = WindowSet.from_frame(df, FEATURE_COLS, window=WINDOW, normalize=normalize)
+    # from_frame keeps the (symbol, timestamp) order of df, so row r of the WindowSet is row r of df
+    return windows, df['timestamp'].to_numpy(), df['price_change_24h'].to_numpy(dtype=float)
+
+
+def run_fold(csv_path, train_start, train_end, test_end, epochs=2, seed=0):
+    """Train on (train_start, train_end], test on (train_end, test_end]; returns per-window predictions"""
+    from tensorflow import keras
+    keras.utils.set_random_seed(seed)
+
+    df = load_history(csv_path)
+    in_train = df['timestamp'] <= train_end
+    if train_start is not None:
+        in_train &= df['timestamp'] > train_start
+    train_df = df[in_train]
+    mean, std = normalization_stats(train_df[FEATURE_COLS].to_numpy(dtype=float))
+    train_windows = WindowSet.from_frame(train_df, FEATURE_COLS, window=WINDOW, normalize=(mean, std))
+    result = {'train_end': train_end, 'test_end': test_end, 'train_windows': len(train_windows)}
+    if len(train_windows) == 0:
+        return dict(result, error='not enough training history')
+
+    started = time.perf_counter()
+    model = build_model(len(FEATURE_COLS))
+    model.fit(window_dataset(train_windows, seed=seed), epochs=epochs, shuffle=False, verbose=0)
+    result['train_s'] = time.perf_counter() - started
+
+    # Test windows end after the cut-off; earlier rows only serve as their context
+    test_df = df[df['timestamp'] <= test_end]
+    windows, timestamps, change_24h = _fold_windows(test_df, (mean, std))
+    last_rows = windows.starts + WINDOW - 1
+    index = np.flatnonzero(timestamps[last_rows] > train_end)
+    if len(index) == 0:
+        return dict(result, error='no test windows')
+    X, y = windows.take(index)
+
+    started = time.perf_counter()
+    numpy_model = NumpyLSTMModel.from_keras(model)
+    preds = numpy_model.predict_on_batch(X).reshape(-1)
+    result['infer_numpy_ms'] = 1000 * (time.perf_counter() - started)
+    started = time.perf_counter()
+    model.predict_on_batch(X.astype(np.float32))
+    result['infer_keras_ms'] = 1000 * (time.perf_counter() - started)
+
+    lstm = [RLForecastAgent._to_forecast(p) for p in preds.tolist()]
+    momentum = [RLForecastAgent._momentum({'price_change_24h': c}) for c in change_24h[last_rows[index]].tolist()]
+    result.update(
+        test_windows=len(index),
+        actual=np.sign(y).tolist(),
+        lstm=[(f['action'], f['confidence']) for f in lstm],
+        momentum=momentum,
+    )
+    return result
+
+
+def score(calls, actual):
+    """
+    Coverage, directional accuracy and calibration of (action, confidence) calls.
+    Windows whose return is exactly flat (actual == 0, common for snapshots taken within
+    one candle) have no direction to call; they are counted as 'flat' and left out of
+    accuracy and calibration.
+    """
+    actual = np.asarray(actual)
+    actions = np.array([a for a, _ in calls])
+    confidence = np.array([c for _, c in calls], dtype=float)
+    called = actions != 'hold'
+    predicted = np.where(actions == 'buy', 1.0, -1.0)
+    scored = called & (actual != 0)
+    correct = (predicted == actual)[scored]
+    confidence = confidence[scored]
+    out = {
+        'windows': len(actions),
+        'flat': int((actual == 0).sum()),
+        'coverage': float(called.mean()) if len(actions) else 0.0,
+        'accuracy': float(correct.mean()) if len(correct) else None,
+        'calibration': [],
+    }
+    ece = 0.0
+    for lo, hi in zip(CALIBRATION_BINS[:-1], CALIBRATION_BINS[1:]):
+        in_bin = (confidence >= lo) & ((confidence < hi) | (hi == CALIBRATION_BINS[-1]))
+        if in_bin.any():
+            mean_conf, hit_rate = float(confidence[in_bin].mean()), float(correct[in_bin].mean())
+            out['calibration'].append({'bin': f"{lo:.2f}-{hi:.2f}", 'count': int(in_bin.sum()),
+                                       'confidence': mean_conf, 'hit_rate': hit_rate})
+            ece += in_bin.sum() * abs(mean_conf - hit_rate)
+    out['ece'] = float(ece / len(correct)) if len(correct) else None
+    return out
+
+
+def evaluate(csv_path, folds=4, workers=None, epochs=2, initial_train=0.5, train_window=None, seed=0,
+             min_edge=0.01):
+    df = load_history(csv_path)
+    boundaries = fold_boundaries(df['timestamp'].to_numpy(), folds, initial_train, train_window)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(boundaries)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    started = time.perf_counter()
+    # spawn: TensorFlow is not fork-safe, and the parent never imports it
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = [pool.submit(run_fold, csv_path, start, end, test_end, epochs, seed + i)
+                   for i, (start, end, test_end) in enumerate(boundaries)]
+        results = [f.result() for f in futures]
+    wall = time.perf_counter() - started
+
+    scored = [r for r in results if 'error' not in r]
+    actual = [a for r in scored for a in r['actual']]
+    report = {
+        'csv_path': csv_path,
+        'wall_seconds': wall,
+        'workers': workers,
+        'folds': [],
+        'lstm': score([c for r in scored for c in r['lstm']], actual),
+        'momentum': score([c for r in scored for c in r['momentum']], actual),
+    }
+    for r in results:
+        fold = {k: r.get(k) for k in ('train_end', 'test_end', 'train_windows', 'test_windows',
+                                      'train_s', 'infer_numpy_ms', 'infer_keras_ms', 'error')}
+        if 'error' not in r:
+            fold['lstm_accuracy'] = score(r['lstm'], r['actual'])['accuracy']
+            fold['momentum_accuracy'] = score(r['momentum'], r['actual'])['accuracy']
+        report['folds'].append(fold)
+    report['recommendation'] = recommend(report['lstm'], report['momentum'], min_edge)
+    return report
+
+
+def recommend(lstm, momentum, min_edge=0.01):
+    """FORECAST_MODEL value the evidence supports: the LSTM only if it beats momentum by min_edge"""
+    if lstm['accuracy'] is None:
+        return 'momentum'
+    if momentum['accuracy'] is None:
+        return 'lstm'
+    return 'lstm' if lstm['accuracy'] >= momentum['accuracy'] + min_edge else 'momentum'
+
+
+def _fmt(value, pattern="{:.3f}"):
+    return "n/a" if value is None else pattern.format(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward evaluation of the forecaster")
+    parser.add_argument('csv_path', nargs='?', default='market_data.csv')
+    parser.add_argument('--folds', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per fold, up to CPUs)")
+    parser.add_argument('--epochs', type=int, default=2)
+    parser.add_argument('--initial-train', type=float, default=0.5, help="share of timestamps before the first fold")
+    parser.add_argument('--train-window', type=int, default=None, help="rolling training window in snapshots (default: expanding)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-edge', type=float, default=0.01,
+                        help="accuracy the LSTM must gain over momentum to be recommended")
+    parser.add_argument('--json', default=None, help="also write the full report to this path")
+    args = parser.parse_args(argv)
+
+    report = evaluate(args.csv_path, folds=args.folds, workers=args.workers, epochs=args.epochs,
+                      initial_train=args.initial_train, train_window=args.train_window, seed=args.seed,
+                      min_edge=args.min_edge)
+
+    print("\nForecast walk-forward report")
+    print("-" * 50)
+    for i, fold in enumerate(report['folds']):
+        if fold.get('error'):
+            print(f"  fold {i}: {fold['error']}")
+            continue
+        print(f"  fold {i}: train={fold['train_windows']} test={fold['test_windows']} "
+              f"lstm={_fmt(fold['lstm_accuracy'])} momentum={_fmt(fold['momentum_accuracy'])} "
+              f"train={fold['train_s']:.1f}s infer numpy={fold['infer_numpy_ms']:.1f}ms "
+              f"keras={fold['infer_keras_ms']:.1f}ms")
+    for name in ('lstm', 'momentum'):
+        stats = report[name]
+        print(f"{name:<9} accuracy={_fmt(stats['accuracy'])} coverage={stats['coverage']:.2f} "
+              f"ECE={_fmt(stats['ece'])} windows={stats['windows']} (flat, not scored: {stats['flat']})")
+        for b in stats['calibration']:
+            print(f"    confidence {b['bin']}: n={b['count']:<6} mean={b['confidence']:.3f} hit rate={b['hit_rate']:.3f}")
+    print(f"Wall: {report['wall_seconds']:.1f}s on {report['workers']} workers")
+    print(f"Recommended: FORECAST_MODEL={report['recommendation']}")
+    print("-" * 50)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import math
+import threading
+
+
+class ChangeDetector:
+    """
+    Decides which symbols deserve a new agent analysis.
+
+    Each symbol is compared with its snapshot at the time it was last analyzed:
+    an RSI level crossing, a MACD histogram sign flip or a price move beyond the
+    threshold marks it as changed. A heartbeat guarantees every symbol is
+    re-analyzed at least every heartbeat_s seconds even in a quiet market.
+    """
+
+    def __init__(self, price_move_pct=1.0, rsi_levels=(30, 70), heartbeat_s=3600):
+        self.price_move_pct = price_move_pct
+        self.rsi_levels = rsi_levels
+        self.heartbeat_s = heartbeat_s
+        self.baseline = {}  # symbol -> {'close', 'RSI', 'MACD_HIST', 'analyzed_at'}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _value(md, key):
+        try:
+            v = float(md.get(key))
+        except (TypeError, ValueError):
+            return None
+        return v if math.isfinite(v) else None
+
+    def detect(self, market_data, now):
+        """Return {symbol: [reasons]} for symbols that changed materially since their last analysis"""
+        changes = {}
+        with self._lock:
+            baseline = dict(self.baseline)
+        for symbol, md in market_data.items():
+            base = baseline.get(symbol)
+            if base is None:
+                changes[symbol] = ['not analyzed yet']
+                continue
+            reasons = []
+            if now - base['analyzed_at'] >= self.heartbeat_s:
+                reasons.append('heartbeat')
+
+            rsi, base_rsi = self._value(md, 'RSI'), base['RSI']
+            if rsi is not None and base_rsi is not None:
+                for level in self.rsi_levels:
+                    if (base_rsi - level) * (rsi - level) < 0:
+                        reasons.append(f"RSI crossed {level} ({base_rsi:.1f} -> {rsi:.1f})")
+
+            hist, base_hist = self._value(md, 'MACD_HIST'), base['MACD_HIST']
+            if hist is not None and base_hist is not None and hist * base_hist < 0:
+                reasons.append('MACD histogram turned ' + ('positive' if hist > 0 else 'negative'))
+
+            close, base_close = self._value(md, 'close'), base['close']
+            if close is not None and base_close:
+                move_pct = (close - base_close) / base_close * 100
+                if abs(move_pct) >= self.price_move_pct:
+                    reasons.append(f"price moved {move_pct:+.2f}%")
+
+            if reasons:
+                changes[symbol] = reasons
+        return changes
+
+    def mark_analyzed(self, market_data, now):
+        """Record the snapshot each symbol was analyzed at"""
+        with self._lock:
+            for symbol, md in market_data.items():
+                self.baseline[symbol] = {
+                    'close': self._value(md, 'close'),
+                    'RSI': self._value(md, 'RSI'),
+                    'MACD_HIST': self._value(md, 'MACD_HIST'),
+                    'analyzed_at': now,
+                }
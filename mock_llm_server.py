@@ -0,0 +1,326 @@
+"""
+Offline stand-in for the Mistral chat completions API.
+
+Serves POST /v1/chat/completions (plain and streamed) with deterministic canned
+replies, so the multi-agent pipeline can be benchmarked without network access.
+Latency is drawn from a log-normal distribution around --latency-ms, text is
+generated at --tokens-per-second and --error-rate of the requests fail. The
+trader gets a well-formed JSON signal block built from the market table in its prompt.
+
+Usage:
+    python mock_llm_server.py --port 8090 --latency-ms 800 --tokens-per-second 80
+    MISTRAL_SERVER_URL=http://127.0.0.1:8090 MISTRAL_API_KEY=offline streamlit run Home.py
+
+    # In-process benchmark of MarketOrchestrator.run_all against the mock
+    python mock_llm_server.py --bench 5 --symbols 43 --max-round-seconds 10
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+TRADER_PREFIX = "You are an expert cryptocurrency trader"
+
+FILLER = (
+    "Momentum and volume remain the deciding factors for the next sessions. ",
+    "Indicators are mixed, so position sizes should stay small. ",
+    "Liquidity is adequate across the majors while smaller tokens remain thin. ",
+    "Risk is skewed to the downside if support levels fail. ",
+    "A confirmed breakout would justify adding exposure. ",
+)
+
+
+def _estimate_tokens(text):
+    return (len(text) + 3) // 4
+
+
+def _market_rows(prompt):
+    """Rows of the multi-pair CSV market table embedded in a prompt"""
+    lines = prompt.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith("symbol,"):
+            header = line.split(",")
+            rows = []
+            for row in lines[i + 1:]:
+                if not row.strip() or "," not in row:
+                    break
+                rows.append(dict(zip(header, row.split(","))))
+            return rows
+    return []
+
+
+def _num(value):
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) else None
+
+
+def canned_reply(system, prompt, rng, completion_tokens=150):
+    """Deterministic reply for one request; the trader proposes the strongest movers"""
+    if system.startswith(TRADER_PREFIX):
+        movers = []
+        for row in _market_rows(prompt):
+            close = _num(row.get("close"))
+            if close and close > 0:
+                movers.append((abs(_num(row.get("price_change_24h")) or 0.0), row["symbol"], close,
+                               _num(row.get("price_change_24h")) or 0.0))
+        movers.sort(reverse=True)
+        signals = [
+            {"symbol": symbol, "action": "buy" if change >= 0 else "sell", "entry_price": close,
+             "confidence": round(rng.uniform(0.5, 0.9), 2), "reason": f"24h change {change:+.2f}%"}
+            for _, symbol, close, change in movers[:2]
+        ]
+        summary = (f"The strongest movers are {', '.join(s['symbol'] for s in signals)}. "
+                   if signals else "No symbol stands out this cycle. ")
+        return summary + "".join(rng.choice(FILLER) for _ in range(3)) + \
+            f"\n```json\n{json.dumps({'signals': signals})}\n```\n"
+
+    bias = rng.choice(("bullish", "neutral", "bearish"))
+    text = f"Overall bias: {bias} (confidence {rng.uniform(0.4, 0.9):.2f}). "
+    while _estimate_tokens(text) < completion_tokens:
+        text += rng.choice(FILLER)
+    return text
+
+
+class MockLLMServer:
+    """
+    Threaded HTTP server speaking enough of the Mistral chat API for BaseAgent.
+    Replies and latencies are seeded from the request content, so identical
+    requests behave identically across runs.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=500.0, latency_sigma=0.3,
+                 tokens_per_second=100.0, error_rate=0.0, completion_tokens=150, seed=0):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.completion_tokens = completion_tokens
+        self.seed = seed
+        self.stats = {"requests": 0, "streamed": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def rng_for(self, body):
+        digest = hashlib.sha256(f"{self.seed}:{json.dumps(body, sort_keys=True)}".encode()).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def latency_s(self, rng):
+        if self.latency_ms <= 0:
+            return 0.0
+        return self.latency_ms / 1000.0 * math.exp(self.latency_sigma * rng.gauss(0.0, 1.0))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        mock = self.server.mock
+        if self.path.rstrip("/") in ("/health", "/stats"):
+            with mock._lock:
+                self._send_json(200, dict(mock.stats))
+        else:
+            self._send_json(404, {"message": "not found"})
+
+    def do_POST(self):
+        mock = self.server.mock
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"message": "not found"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            self._send_json(400, {"message": "invalid JSON body"})
+            return
+
+        mock.count("requests")
+        rng = mock.rng_for(body)
+        messages = body.get("messages") or []
+        system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+        prompt = next((m.get("content") or "" for m in messages if m.get("role") == "user"), "")
+        max_tokens = body.get("max_tokens") or mock.completion_tokens
+        text = canned_reply(system, prompt, rng, min(mock.completion_tokens, max_tokens))
+        latency = mock.latency_s(rng)
+
+        if rng.random() < mock.error_rate:
+            mock.count("errors")
+            time.sleep(latency)
+            self._send_json(503, {"message": "mock upstream failure"})
+            return
+
+        usage = {
+            "prompt_tokens": _estimate_tokens(system) + _estimate_tokens(prompt),
+            "completion_tokens": _estimate_tokens(text),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        common = {"id": uuid.uuid4().hex, "model": body.get("model", "mock"), "created": int(time.time())}
+
+        if body.get("stream"):
+            mock.count("streamed")
+            self._stream(mock, text, latency, usage, common)
+            return
+
+        if mock.tokens_per_second > 0:
+            latency += usage["completion_tokens"] / mock.tokens_per_second
+        time.sleep(latency)
+        self._send_json(200, dict(
+            common,
+            object="chat.completion",
+            usage=usage,
+            choices=[{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        ))
+
+    def _stream(self, mock, text, ttft, usage, common):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(choice, **extra):
+            chunk = dict(common, object="chat.completion.chunk", choices=[dict(index=0, **choice)], **extra)
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        time.sleep(ttft)
+        words = text.split(" ")
+        for i in range(0, len(words), 4):
+            piece = " ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "")
+            send({"delta": {"content": piece}, "finish_reason": None})
+            if mock.tokens_per_second > 0:
+                time.sleep(_estimate_tokens(piece) / mock.tokens_per_second)
+        send({"delta": {"content": ""}, "finish_reason": "stop"}, usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def synthetic_market_data(symbols, round_index=0, seed=0):
+    """Deterministic multi-pair market data; prices drift per round so responses are not cached"""
+    rng = random.Random(f"{seed}:{round_index}")
+    data = {}
+    for i in range(symbols):
+        close = 10 ** rng.uniform(-4, 4.5)
+        data[f"SYM{i:02d}USDT"] = {
+            "close": close, "open": close * rng.uniform(0.98, 1.02), "high": close * 1.02,
+            "low": close * 0.98, "volume": rng.uniform(1e3, 1e7), "RSI": rng.uniform(15, 85),
+            "SMA_20": close * rng.uniform(0.95, 1.05), "SMA_50": close * rng.uniform(0.9, 1.1),
+            "MACD": rng.gauss(0, close * 0.01), "MACD_SIGNAL": rng.gauss(0, close * 0.01),
+            "MACD_HIST": rng.gauss(0, close * 0.005), "price_change_24h": rng.gauss(0, 4),
+        }
+    return data
+
+
+def run_benchmark(server, rounds=3, symbols=43, concurrency=9):
+    """Time MarketOrchestrator.run_all against the mock server; returns per-round wall seconds"""
+    os.environ["MISTRAL_SERVER_URL"] = server.url
+    from agents.metrics import agent_metrics
+    from agents.specialized_agents import MarketOrchestrator
+
+    orchestrator = MarketOrchestrator(os.getenv("MISTRAL_API_KEY") or "offline", max_concurrency=concurrency)
+    walls = []
+    for i in range(rounds):
+        market_data = synthetic_market_data(symbols, round_index=i, seed=server.seed)
+        start = time.perf_counter()
+        orchestrator.run_all(market_data, multi_pair=True)
+        walls.append(time.perf_counter() - start)
+        print(f"round {i + 1}: {walls[-1]:.2f}s")
+    return walls, agent_metrics.snapshot()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline mock of the Mistral chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="median time to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="log-normal spread of the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0, help="generation speed (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--completion-tokens", type=int, default=150, help="length of non-trader replies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bench", type=int, default=0, metavar="ROUNDS",
+                        help="run MarketOrchestrator.run_all ROUNDS times in-process and exit")
+    parser.add_argument("--symbols", type=int, default=43, help="symbols per benchmark round")
+    parser.add_argument("--max-round-seconds", type=float, default=None,
+                        help="exit 1 if the median benchmark round is slower")
+    args = parser.parse_args(argv)
+
+    server = MockLLMServer(
+        host=args.host, port=0 if args.bench else args.port, latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma, tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate, completion_tokens=args.completion_tokens, seed=args.seed,
+    )
+    if not args.bench:
+        print(f"Mock LLM server listening on {server.url} (set MISTRAL_SERVER_URL to use it)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    server.start()
+    try:
+        walls, metrics = run_benchmark(server, rounds=args.bench, symbols=args.symbols)
+    finally:
+        server.stop()
+    median = sorted(walls)[len(walls) // 2]
+    print(f"\nRounds: {len(walls)}  median: {median:.2f}s  max: {max(walls):.2f}s  "
+          f"requests: {server.stats['requests']}  errors: {server.stats['errors']}  "
+          f"throughput: {server.stats['requests'] / sum(walls):.1f} req/s")
+    for name, stats in metrics.items():
+        p50 = stats["wall_p50"]
+        print(f"  {name:<26} calls={stats['calls']:<4} errors={stats['errors']:<3} "
+              f"p50={p50 if p50 is None else round(p50, 3)}s")
+    if args.max_round_seconds is not None and median > args.max_round_seconds:
+        print(f"Median round exceeded {args.max_round_seconds:.1f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
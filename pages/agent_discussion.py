@@ -39,26 +39,25 @@ with col1:
         time.time() - st.session_state.last_discussion_update > update_interval * 60
     )):
         with st.spinner("Agents are discussing..."):
-            # Get market data for all pairs
-            market_data = st.session_state.trading_system.get_all_market_data()
+            # Reuse the trading system's current market snapshot (shared formatted context)
+            market_context = st.session_state.trading_system.get_market_context(max_age=update_interval * 60)
             
             # Build prompts as strings for each agent
-            import json as _json
-            def _format_prompt(agent, md):
+            def _format_prompt(agent, ctx):
                 base = agent.system_message.content if getattr(agent, 'system_message', None) else ""
                 return f"""
 {base}
 
-Current Market Data:
-{_json.dumps(md, indent=2)}
+Current Market Data (CSV):
+{ctx.table if ctx else "unavailable"}
 
 Provide your analysis based on this market data.
 """
 
-            trader_prompt = _format_prompt(st.session_state.trading_system.trader, market_data)
-            risk_prompt = _format_prompt(st.session_state.trading_system.risk_advisor, market_data)
-            technical_prompt = _format_prompt(st.session_state.trading_system.graph_analyst, market_data)
-            financial_prompt = _format_prompt(st.session_state.trading_system.financial_advisor, market_data)
+            trader_prompt = _format_prompt(st.session_state.trading_system.trader, market_context)
+            risk_prompt = _format_prompt(st.session_state.trading_system.risk_advisor, market_context)
+            technical_prompt = _format_prompt(st.session_state.trading_system.graph_analyst, market_context)
+            financial_prompt = _format_prompt(st.session_state.trading_system.financial_advisor, market_context)
 
             # Get individual analyses
             trader_analysis = st.session_state.trading_system.trader.get_response(trader_prompt)
@@ -0,0 +1,301 @@
+"""
+Offline replay harness.
+
+Replays a recorded market session (the CSV written by
+TradingSystem.save_all_market_data_csv) through the real TradingSystem code
+paths -- get_all_market_data, analyze_market, extract_trading_signals,
+place_signal_order and manage_open_positions -- using a simulated
+clock, a fake exchange and a stubbed LLM with canned responses.
+
+Usage:
+    python replay.py market_data.csv --max-cycles 24 --max-wall-seconds 60
+"""
+import argparse
+import bisect
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from agents.base_agent import BaseAgent
+from agents.rl_agent import RLForecastAgent
+from state_manager import StateManager
+from trading_system import TradingSystem
+
+
+class SimulatedClock:
+    """Clock that only moves when the replay advances it (seconds since epoch)."""
+
+    def __init__(self, start=0.0):
+        self.current = float(start)
+
+    def now(self):
+        return self.current
+
+    def set_ms(self, timestamp_ms):
+        self.current = timestamp_ms / 1000.0
+
+
+class FakeExchange:
+    """
+    Minimal stand-in for binance.client.Client backed by recorded snapshots.
+    Only rows at or before the simulated clock are visible.
+    """
+
+    def __init__(self, csv_path, clock, step_size='0.00001000', min_notional='5.0'):
+        self.clock = clock
+        self.step_size = step_size
+        self.min_notional = min_notional
+        self.timestamps = {}
+        self.rows = {}
+        with open(csv_path, newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    ts = int(float(row['timestamp']))
+                    ohlcv = [float(row[k]) for k in ('open', 'high', 'low', 'close', 'volume')]
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self.timestamps.setdefault(row['symbol'], []).append(ts)
+                self.rows.setdefault(row['symbol'], []).append(ohlcv)
+        # Keep each symbol ordered by time for bisect lookups
+        for symbol in self.timestamps:
+            order = sorted(range(len(self.timestamps[symbol])), key=self.timestamps[symbol].__getitem__)
+            self.timestamps[symbol] = [self.timestamps[symbol][i] for i in order]
+            self.rows[symbol] = [self.rows[symbol][i] for i in order]
+        self.calls = 0
+
+    def session_timestamps(self):
+        return sorted({ts for series in self.timestamps.values() for ts in series})
+
+    def _visible(self, symbol):
+        if symbol not in self.timestamps:
+            raise ValueError(f"Invalid symbol {symbol}")
+        end = bisect.bisect_right(self.timestamps[symbol], int(self.clock.now() * 1000))
+        if end == 0:
+            raise ValueError(f"No data for {symbol} yet")
+        return end
+
+    def get_system_status(self):
+        self.calls += 1
+        return {'status': 0, 'msg': 'replay'}
+
+    def get_symbol_ticker(self, symbol):
+        self.calls += 1
+        end = self._visible(symbol)
+        return {'symbol': symbol, 'price': str(self.rows[symbol][end - 1][3])}
+
+    def get_klines(self, symbol, interval='1h', limit=500):
+        self.calls += 1
+        end = self._visible(symbol)
+        start = max(0, end - limit)
+        klines = []
+        for ts, (o, h, l, c, v) in zip(self.timestamps[symbol][start:end], self.rows[symbol][start:end]):
+            klines.append([ts, str(o), str(h), str(l), str(c), str(v), ts, '0', 0, '0', '0', '0'])
+        return klines
+
+    def get_symbol_info(self, symbol):
+        self.calls += 1
+        return {
+            'symbol': symbol,
+            'filters': [
+                {'filterType': 'LOT_SIZE', 'stepSize': self.step_size},
+                {'filterType': 'MIN_NOTIONAL', 'minNotional': self.min_notional},
+            ],
+        }
+
+    def top_mover(self):
+        """Symbol with the largest move between the last two visible snapshots."""
+        best, best_move = None, 0.0
+        for symbol in self.timestamps:
+            try:
+                end = self._visible(symbol)
+            except ValueError:
+                continue
+            if end < 2:
+                continue
+            prev_close, close = self.rows[symbol][end - 2][3], self.rows[symbol][end - 1][3]
+            move = (close - prev_close) / prev_close if prev_close else 0.0
+            if best is None or abs(move) > abs(best_move):
+                best, best_move = symbol, move
+        return best, best_move
+
+
+class CannedLLMClient:
+    """
+    Stubbed Mistral client exposing chat.complete() and chat.stream(). The responder receives the
+    system and user message contents and returns the canned reply.
+    """
+
+    def __init__(self, responder, latency_s=0.0):
+        self.responder = responder
+        self.latency_s = latency_s
+        self.calls = 0
+        self.chat = SimpleNamespace(complete=self.complete, stream=self.stream)
+
+    def complete(self, model=None, messages=None, temperature=None, max_tokens=None, **kwargs):
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        messages = messages or []
+        system = next((m['content'] for m in messages if m['role'] == 'system'), '')
+        user = next((m['content'] for m in messages if m['role'] == 'user'), '')
+        content = self.responder(system, user)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def stream(self, **kwargs):
+        """Same canned reply as complete(), delivered line by line as stream events."""
+        content = self.complete(**kwargs).choices[0].message.content
+        for chunk in content.splitlines(keepends=True):
+            yield SimpleNamespace(data=SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))]))
+
+
+def canned_responder(exchange):
+    """Default canned replies: the trader proposes the top mover, everyone else agrees."""
+    def respond(system, prompt):
+        if system.startswith("You are an expert cryptocurrency trader"):
+            symbol, move = exchange.top_mover()
+            if symbol is None:
+                return "No trading opportunities yet."
+            price = exchange.get_symbol_ticker(symbol)['price']
+            action = 'buy' if move >= 0 else 'sell'
+            signal = {'symbol': symbol, 'action': action, 'entry_price': float(price),
+                      'confidence': 0.6, 'reason': f"top mover ({move:+.2f}%)"}
+            return (
+                f"{symbol} is the strongest mover this hour.\n"
+                f"```json\n{json.dumps({'signals': [signal]})}\n```\n"
+            )
+        return "Canned analysis: market conditions unchanged."
+    return respond
+
+
+class ReplayHarness:
+    """Drives a TradingSystem through a recorded session faster than real time."""
+
+    def __init__(self, csv_path, llm_latency_s=0.0, warmup=50, initial_balance_usd=100.0, on_change=False):
+        self.clock = SimulatedClock()
+        self.exchange = FakeExchange(csv_path, self.clock)
+        self.llm = CannedLLMClient(canned_responder(self.exchange), latency_s=llm_latency_s)
+        self.warmup = warmup
+        self.on_change = on_change
+        self.state_dir = tempfile.mkdtemp(prefix='replay_')
+        self.timings = {}
+
+        timestamps = self.exchange.session_timestamps()
+        if not timestamps:
+            raise ValueError(f"No recorded snapshots in {csv_path}")
+        self.clock.set_ms(timestamps[0])
+        self.system = TradingSystem(
+            initial_balance_usd=initial_balance_usd,
+            auto_buy_btc=False,
+            load_saved_state=False,
+            client=self.exchange,
+            state_manager=StateManager(os.path.join(self.state_dir, 'trading_state.json')),
+            clock=self.clock.now,
+        )
+        for agent in vars(self.system).values():
+            if isinstance(agent, BaseAgent) and agent.system_message is not None:
+                agent.client = self.llm
+        # The forecaster would otherwise train on the full recording (look-ahead); the
+        # process-wide one is left alone and this system gets its own, without history
+        self.system.rl_forecast_agent = RLForecastAgent(csv_path='', model_dir='')
+
+        for name in ('get_all_market_data', 'extract_trading_signals',
+                     'place_signal_order', 'manage_open_positions', 'analyze_market',
+                     'poll_market_changes'):
+            setattr(self.system, name, self._timed(name, getattr(self.system, name)))
+
+    def _timed(self, name, func):
+        samples = self.timings.setdefault(name, [])
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return wrapper
+
+    def run(self, max_cycles=None):
+        """Replay every recorded snapshot after the warmup window and return a report."""
+        timestamps = self.exchange.session_timestamps()[self.warmup:]
+        if max_cycles:
+            timestamps = timestamps[:max_cycles]
+        trades_before = len(self.system.wallet.trade_history)
+
+        start = time.perf_counter()
+        for ts in timestamps:
+            self.clock.set_ms(ts)
+            if self.on_change:
+                self.system.analyze_if_changed()
+            else:
+                self.system.analyze_market()
+            # Let the execution worker drain before the simulated clock moves on
+            self.system.wait_for_execution()
+            self.system.manage_open_positions()
+        wall = time.perf_counter() - start
+
+        simulated = (timestamps[-1] - timestamps[0]) / 1000.0 if len(timestamps) > 1 else 0.0
+        return {
+            'cycles': len(timestamps),
+            'wall_seconds': wall,
+            'simulated_seconds': simulated,
+            'speedup': simulated / wall if wall > 0 else float('inf'),
+            'llm_calls': self.llm.calls,
+            'exchange_calls': self.exchange.calls,
+            'trades': len(self.system.wallet.trade_history) - trades_before,
+            'execution': self.system.execution_worker.stats(),
+            'stages': {name: _summarize(samples) for name, samples in self.timings.items() if samples},
+        }
+
+
+def _summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean_ms': 1000 * sum(ordered) / len(ordered),
+        'p50_ms': 1000 * ordered[len(ordered) // 2],
+        'max_ms': 1000 * ordered[-1],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded market session offline")
+    parser.add_argument('csv_path', nargs='?', default='market_data.csv')
+    parser.add_argument('--max-cycles', type=int, default=None)
+    parser.add_argument('--warmup', type=int, default=50, help="snapshots to skip so indicators are populated")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="seconds each canned LLM call sleeps")
+    parser.add_argument('--max-wall-seconds', type=float, default=None, help="fail if the replay takes longer")
+    parser.add_argument('--on-change', action='store_true', help="use change-triggered analysis instead of every snapshot")
+    args = parser.parse_args(argv)
+
+    harness = ReplayHarness(args.csv_path, llm_latency_s=args.llm_latency, warmup=args.warmup,
+                            on_change=args.on_change)
+    report = harness.run(max_cycles=args.max_cycles)
+
+    print("\nReplay report")
+    print("-" * 50)
+    print(f"Cycles: {report['cycles']}  Trades: {report['trades']}  "
+          f"LLM calls: {report['llm_calls']}  Exchange calls: {report['exchange_calls']}")
+    print(f"Simulated: {report['simulated_seconds']:.0f}s  Wall: {report['wall_seconds']:.2f}s  "
+          f"Speedup: {report['speedup']:.0f}x")
+    execution = report['execution']
+    fill_p50 = execution['fill_latency_p50']
+    print(f"Signals: {execution['received']} received, {execution['filled']} filled, "
+          f"{execution['stale']} stale, {execution['skipped']} skipped"
+          + (f"  Signal-to-fill p50: {1000 * fill_p50:.1f}ms" if fill_p50 is not None else ""))
+    for name, stats in report['stages'].items():
+        print(f"  {name:<28} n={stats['count']:<5} mean={stats['mean_ms']:.1f}ms "
+              f"p50={stats['p50_ms']:.1f}ms max={stats['max_ms']:.1f}ms")
+    print("-" * 50)
+
+    if args.max_wall_seconds is not None and report['wall_seconds'] > args.max_wall_seconds:
+        print(f"Replay exceeded wall budget of {args.max_wall_seconds:.1f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import numpy as np
+
+
+DEFAULT_WEIGHTS = {'rsi': 1.0, 'macd': 1.0, 'volume': 1.0, 'change': 1.0}
+
+
+def parse_weights(text):
+    """Parse 'rsi=1,macd=0.5,...' into a weights dict (unknown or malformed entries are ignored)"""
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in (text or '').split(','):
+        key, _, value = item.partition('=')
+        key = key.strip().lower()
+        if key in weights:
+            try:
+                weights[key] = float(value)
+            except ValueError:
+                print(f"Ignoring invalid screener weight: {item}")
+    return weights
+
+
+class Screener:
+    """
+    Cheap pre-screen between market data and the agents.
+
+    Every symbol gets a score from four signals computed over all symbols at once:
+    RSI distance from 50, MACD histogram relative to price, volume z-score and the
+    absolute 24h change. Each signal is standardized across the universe so the
+    weights are comparable; only the top_k symbols (plus pinned ones such as open
+    positions) are passed on. top_k <= 0 disables screening.
+    """
+
+    def __init__(self, top_k=10, weights=None):
+        self.top_k = top_k
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+
+    @staticmethod
+    def _column(market_data, key):
+        values = []
+        for md in market_data.values():
+            try:
+                values.append(float(md.get(key)))
+            except (TypeError, ValueError):
+                values.append(np.nan)
+        return np.array(values, dtype=float)
+
+    @staticmethod
+    def _standardize(values):
+        values = np.where(np.isfinite(values), values, np.nan)
+        if np.all(np.isnan(values)):
+            return np.zeros_like(values)
+        std = np.nanstd(values)
+        z = (values - np.nanmean(values)) / std if std > 0 else np.zeros_like(values)
+        return np.nan_to_num(z, nan=0.0)
+
+    def scores(self, market_data):
+        """Return {symbol: score} for every symbol in market_data"""
+        if not market_data:
+            return {}
+        close = self._column(market_data, 'close')
+        rsi = self._column(market_data, 'RSI')
+        macd_hist = self._column(market_data, 'MACD_HIST')
+        change = self._column(market_data, 'price_change_24h')
+        volume_z = self._column(market_data, 'volume_z')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            macd_pct = np.abs(macd_hist) / close * 100
+            if np.all(np.isnan(volume_z)):
+                # No per-symbol history: fall back to quote volume relative to the universe
+                volume_z = np.log(self._column(market_data, 'volume') * close)
+
+        components = {
+            'rsi': np.abs(rsi - 50),
+            'macd': macd_pct,
+            'volume': volume_z,
+            'change': np.abs(change),
+        }
+        total = np.zeros(len(market_data))
+        for name, values in components.items():
+            total += self.weights.get(name, 0.0) * self._standardize(values)
+        return dict(zip(market_data.keys(), total.tolist()))
+
+    def select(self, market_data, always_include=()):
+        """Return the top_k symbols of market_data by score plus any pinned symbols, best first"""
+        if self.top_k <= 0 or len(market_data) <= self.top_k:
+            return market_data
+        scores = self.scores(market_data)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        selected = ranked[:self.top_k]
+        selected += [s for s in ranked[self.top_k:] if s in set(always_include)]
+        return {symbol: market_data[symbol] for symbol in selected}
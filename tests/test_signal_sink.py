@@ -0,0 +1,63 @@
+import threading
+import unittest
+
+from agents.fanout import run_concurrently
+from agents.signal_parser import tee_signals
+from execution import SignalSink
+
+SIGNAL = '{"symbol": "BTCUSDT", "action": "buy", "entry_price": 100.0}'
+
+
+class SignalSinkTest(unittest.TestCase):
+    def setUp(self):
+        self.submitted = []
+        self.sink = SignalSink(self.submitted.append, symbols=["BTCUSDT", "ETHUSDT"])
+
+    def _signal(self, symbol="BTCUSDT", action="buy"):
+        return {"symbol": symbol, "action": action, "entry_price": 100.0}
+
+    def test_each_signal_is_submitted_once(self):
+        self.sink(self._signal())
+        self.sink(self._signal())
+        self.sink(self._signal(action="sell"))
+        self.assertEqual([(s["symbol"], s["action"]) for s in self.submitted],
+                         [("BTCUSDT", "buy"), ("BTCUSDT", "sell")])
+
+    def test_late_signal_after_close_is_dropped(self):
+        self.sink.close()
+        self.sink(self._signal())
+        self.assertEqual(self.submitted, [])
+        self.assertEqual(self.sink.dropped, 1)
+
+    def test_closed_branch_drops_while_cycle_continues(self):
+        branch = self.sink.branch()
+        branch.close()
+        branch(self._signal())
+        self.sink(self._signal("ETHUSDT"))
+        self.assertEqual([s["symbol"] for s in self.submitted], ["ETHUSDT"])
+
+    def test_timed_out_trader_stream_cannot_trade(self):
+        branch = self.sink.branch()
+        release = threading.Event()
+        finished = threading.Event()
+
+        def trader():
+            feed = tee_signals(None, branch)
+            feed("Plan: ")
+            release.wait(5)
+            # The fan-out has given up on this call by now
+            feed(SIGNAL)
+            finished.set()
+            return "Plan: " + SIGNAL
+
+        results = run_concurrently({"Trader's Analysis": trader}, timeout=0.2)
+        branch.close()
+        self.assertIn("Trader's Analysis", results.missing)
+        release.set()
+        self.assertTrue(finished.wait(5))
+        self.assertEqual(self.submitted, [])
+        self.assertEqual(branch.dropped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
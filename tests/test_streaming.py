@@ -0,0 +1,114 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from agents.base_agent import BaseAgent
+from agents.fanout import is_error, run_concurrently
+from agents.response_cache import ResponseCache
+
+
+def _event(text):
+    return SimpleNamespace(data=SimpleNamespace(
+        usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=text))]))
+
+
+class _FakeChat:
+    """Streams the given deltas (after `gate` opens, if set), then raises `fail` if set"""
+
+    def __init__(self, deltas, fail=None, gate=None):
+        self.deltas = deltas
+        self.fail = fail
+        self.gate = gate
+        self.calls = 0
+
+    def stream(self, **request):
+        self.calls += 1
+        for i, text in enumerate(self.deltas):
+            if i == 1 and self.gate is not None:
+                self.gate.wait(5)
+            yield _event(text)
+        if self.fail is not None:
+            raise self.fail
+
+
+def _agent(chat):
+    agent = BaseAgent(api_key=None)
+    agent.client = SimpleNamespace(chat=chat)
+    agent.cache = ResponseCache(ttl=300)
+    return agent
+
+
+class StreamFailureTest(unittest.TestCase):
+    def test_stream_cut_off_part_way_is_an_error(self):
+        agent = _agent(_FakeChat(["BTC looks ", "strong, "], fail=TimeoutError("read timeout")))
+        tokens = []
+        text = agent.respond("analyze", tokens.append)
+        self.assertEqual(tokens, ["BTC looks ", "strong, "])
+        self.assertTrue(text.startswith("Error generating response"), text)
+        self.assertTrue(is_error(text))
+
+    def test_truncated_stream_is_missing_from_fan_out(self):
+        broken = _agent(_FakeChat(["BTC looks strong, "], fail=TimeoutError("read timeout")))
+        healthy = _agent(_FakeChat(["ETH ranges."]))
+        results = run_concurrently({
+            "broken": lambda: broken.respond("a", lambda delta: None),
+            "healthy": lambda: healthy.respond("b", lambda delta: None),
+        })
+        self.assertEqual(results["healthy"], "ETH ranges.")
+        self.assertIn("broken", results.missing)
+        self.assertIn("read timeout", results.missing["broken"])
+
+    def test_truncated_stream_is_not_cached(self):
+        chat = _FakeChat(["partial"], fail=TimeoutError("read timeout"))
+        agent = _agent(chat)
+        agent.respond("analyze", lambda delta: None)
+        chat.fail = None
+        self.assertEqual(agent.respond("analyze", lambda delta: None), "partial")
+        self.assertEqual(chat.calls, 2)
+
+
+
+class StreamCoalescingTest(unittest.TestCase):
+    def test_identical_streams_make_one_call(self):
+        gate = threading.Event()
+        chat = _FakeChat(["BTC ", "looks ", "strong."], gate=gate)
+        agent = _agent(chat)
+        leader_tokens, results = [], {}
+
+        def ask(name, tokens):
+            results[name] = agent.respond("analyze", tokens.append)
+
+        leader = threading.Thread(target=ask, args=("leader", leader_tokens))
+        leader.start()
+        while chat.calls == 0:  # leader owns the key once its request is out
+            time.sleep(0.001)
+        follower = threading.Thread(target=ask, args=("follower", []))
+        follower.start()
+        gate.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(chat.calls, 1)
+        self.assertEqual(leader_tokens, ["BTC ", "looks ", "strong."])
+        self.assertEqual(results, {"leader": "BTC looks strong.", "follower": "BTC looks strong."})
+        self.assertEqual(agent.cache.stats()["coalesced"], 1)
+
+    def test_failed_stream_releases_the_key(self):
+        gate = threading.Event()
+        chat = _FakeChat(["partial", "more"], fail=TimeoutError("read timeout"), gate=gate)
+        agent = _agent(chat)
+        results = {}
+        leader = threading.Thread(target=lambda: results.update(leader=agent.respond("analyze", lambda d: None)))
+        leader.start()
+        while chat.calls == 0:  # leader owns the key once its request is out
+            time.sleep(0.001)
+        gate.set()
+        leader.join(5)
+        chat.fail = None
+        self.assertTrue(results["leader"].startswith("Error generating response"))
+        self.assertEqual(agent.respond("analyze", lambda d: None), "partialmore")
+        self.assertEqual(chat.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
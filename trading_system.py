@@ -1,4 +1,7 @@
 import os
+import queue
+import threading
+import time
 from dotenv import load_dotenv
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
@@ -16,20 +19,82 @@ from agents.specialized_agents import (
     LiquidityAnalysisAgent,
     CorrelationAnalysisAgent
 )
-from agents.rl_agent import RLForecastAgent
+from agents.rl_agent import get_forecast_agent
+from agents.fanout import AgentResults, LatencyTracker, is_error, run_concurrently
+from agents.prompt_encoding import estimate_tokens
+from agents.market_context import MarketContext
+from agents.signal_parser import parse_signals, tee_signals
 from wallet import Wallet
 
 from state_manager import StateManager
+from market_monitor import ChangeDetector
+from screener import Screener, parse_weights
+from execution import ExecutionWorker, SignalBus, SignalSink
 
 class TradingSystem:
-    def __init__(self, initial_balance_usd=100.0, auto_buy_btc=True, load_saved_state=True):
+    # Major cryptocurrencies (verified on Binance)
+    MAJOR_COINS = [
+        "BTCUSDT",  # Bitcoin
+        "ETHUSDT",  # Ethereum
+        "BNBUSDT",  # Binance Coin
+        "SOLUSDT",  # Solana
+        "ADAUSDT",  # Cardano
+        "XRPUSDT",  # XRP
+        "TRXUSDT",  # TRON
+        "LTCUSDT",  # Litecoin
+        "BCHUSDT",  # Bitcoin Cash
+        "DOTUSDT",  # Polkadot
+        "MATICUSDT", # Polygon
+        "AVAXUSDT", # Avalanche
+        "LINKUSDT", # Chainlink
+        "ATOMUSDT",  # Cosmos
+        "FILUSDT",   # Filecoin
+        "NEARUSDT",  # NEAR Protocol
+        "ARBUSDT",   # Arbitrum
+        "OPUSDT",    # Optimism
+        "SUIUSDT",   # Sui
+        "SEIUSDT",   # Sei
+        "RUNEUSDT"   # THORChain
+    ]
+
+    # Meme coins and community tokens (verified on Binance)
+    MEME_COINS = [
+        "DOGEUSDT",  # Dogecoin
+        "SHIBUSDT",  # Shiba Inu
+        "PEPEUSDT",  # Pepe
+        "FLOKIUSDT", # Floki
+        "BONKUSDT",  # Bonk
+        "WIFUSDT",   # dogwifhat
+        "MEMEUSDT",  # Memecoin
+        "GMTUSDT",   # STEPN
+        "GALAUSDT",  # Gala Games
+        "APTUSDT",   # Aptos
+        "IMXUSDT",   # Immutable X
+        "MASKUSDT",  # Mask Network
+        "FETUSDT",   # Fetch.ai
+        "AGIXUSDT",  # SingularityNET
+        "ICPUSDT",   # Internet Computer
+        "JASMYUSDT", # JasmyCoin
+        "GMXUSDT",   # GMX
+        "CHZUSDT",   # Chiliz
+        "PERPUSDT",  # Perpetual Protocol
+        "STXUSDT",   # Stacks
+        "REEFUSDT",  # Reef
+        "TRUUSDT"    # TrueFi
+    ]
+
+    def __init__(self, initial_balance_usd=100.0, auto_buy_btc=True, load_saved_state=True,
+                 client=None, state_manager=None, clock=None):
         load_dotenv()
         
         # Initialize state manager
-        self.state_manager = StateManager()
+        self.state_manager = state_manager or StateManager()
+
+        # Wall clock used to timestamp virtual orders (replaceable for offline replays)
+        self.clock = clock or time.time
         
-        # Initialize Binance client for real market data
-        self.client = Client(
+        # Initialize Binance client for real market data (or an injected exchange)
+        self.client = client or Client(
             os.getenv('BINANCE_API_KEY'),
             os.getenv('BINANCE_API_SECRET')
         )
@@ -65,8 +130,80 @@ class TradingSystem:
         # Consensus advisor (synthesizes all analyses)
         self.consensus_advisor = ConsensusAdvisorAgent(mistral_key)
 
-        # RL + LSTM forecast agent (optional, uses CSV history)
-        self.rl_forecast_agent = RLForecastAgent(csv_path='market_data.csv')
+        # RL + LSTM forecast agent (optional, uses CSV history); shared by every system in
+        # the process so there is one feature store and one training worker
+        self.rl_forecast_agent = get_forecast_agent('market_data.csv')
+
+        # Agent fan-out: concurrency cap, per-agent timeout and how many analyses
+        # must arrive before consensus runs (defaults to all nine analysts)
+        self.agent_concurrency = int(os.getenv('AGENT_CONCURRENCY', '9'))
+        self.agent_timeout_s = float(os.getenv('AGENT_TIMEOUT_SECONDS', '60'))
+        self.consensus_quorum = int(os.getenv('CONSENSUS_QUORUM', '9'))
+        for agent in (self.trader, self.risk_advisor, self.graph_analyst, self.financial_advisor,
+                      self.sentiment_analyst, self.macro_analyst, self.onchain_analyst,
+                      self.liquidity_analyst, self.correlation_analyst, self.consensus_advisor):
+            agent.timeout_s = self.agent_timeout_s
+
+        # Cycle deadline: analysts must finish synthesis_budget_s before it so that
+        # consensus and the final plan still fit. Per-agent latency budgets override
+        # agent_timeout_s by section name; stragglers past the HEDGE_PERCENTILE latency
+        # of their agent get one hedged duplicate request (0 disables hedging)
+        self.cycle_deadline_s = float(os.getenv('CYCLE_DEADLINE_SECONDS', '150'))
+        self.synthesis_budget_s = float(os.getenv('SYNTHESIS_BUDGET_SECONDS', '60'))
+        self.agent_latency_budgets = {}
+        self.hedge_percentile = float(os.getenv('HEDGE_PERCENTILE', '90'))
+        self.hedge_min_delay_s = 2.0
+        self.agent_latency = LatencyTracker()
+
+        # Approximate prompt token budget per analyst in multi-pair mode; override
+        # individual agents by class name, e.g. {'MacroEconomicAgent': 1500}
+        self.prompt_token_budget = int(os.getenv('PROMPT_TOKEN_BUDGET', '4000'))
+        self.prompt_token_budgets = {}
+        self.last_prompt_tokens = {}
+
+        # Change-triggered analysis: symbols are re-analyzed when RSI crosses 30/70, the
+        # MACD histogram flips sign or price moves PRICE_MOVE_TRIGGER_PCT, and at least
+        # every ANALYSIS_HEARTBEAT_MINUTES regardless
+        self.change_detector = ChangeDetector(
+            price_move_pct=float(os.getenv('PRICE_MOVE_TRIGGER_PCT', '1.0')),
+            heartbeat_s=float(os.getenv('ANALYSIS_HEARTBEAT_MINUTES', '60')) * 60,
+        )
+
+        # Pre-screen: only the SCREEN_TOP_K highest scoring symbols (plus open positions)
+        # reach the agents; SCREEN_WEIGHTS like "rsi=1,macd=1,volume=0.5,change=1".
+        # SCREEN_TOP_K=0 sends every symbol
+        self.screener = Screener(
+            top_k=int(os.getenv('SCREEN_TOP_K', '15')),
+            weights=parse_weights(os.getenv('SCREEN_WEIGHTS', '')),
+        )
+
+        # Sharded (map-reduce) analysis: with SHARDED_ANALYSIS=1, universes larger than
+        # SHARD_MAX_SYMBOLS are split into majors/memes shards of at most that size; the
+        # analysts run on every shard in parallel and a compact consensus reduces them
+        self.sharded_analysis = os.getenv('SHARDED_ANALYSIS', '0') == '1'
+        self.shard_max_symbols = int(os.getenv('SHARD_MAX_SYMBOLS', '12'))
+        self.shard_concurrency = int(os.getenv('SHARD_CONCURRENCY', '4'))
+
+        # Serializes wallet updates from signals executed while agents stream. Signal orders
+        # reserve their symbol (and the USD of a buy) under it, then call Binance without it
+        self._trade_lock = threading.RLock()
+        self._orders_in_flight = set()
+        self._reserved_usd = 0.0
+
+        # Signal execution: signals are queued on a bus and filled by a background worker
+        # (ASYNC_EXECUTION=0 executes inline). A signal is dropped when the price has moved
+        # more than ENTRY_PRICE_TOLERANCE_PCT from its entry or it waited SIGNAL_MAX_AGE_SECONDS
+        self.entry_price_tolerance = float(os.getenv('ENTRY_PRICE_TOLERANCE_PCT', '1.0')) / 100
+        self.async_execution = os.getenv('ASYNC_EXECUTION', '1') == '1'
+        self.signal_bus = SignalBus()
+        self.execution_worker = ExecutionWorker(
+            self, self.signal_bus,
+            tolerance=self.entry_price_tolerance,
+            max_age_s=float(os.getenv('SIGNAL_MAX_AGE_SECONDS', '120')),
+        )
+
+        # Most recent multi-pair MarketContext, shared with pages that need the same snapshot
+        self.market_context = None
         
         # Scalping configuration (micro profits, quick losses)
         self.scalp_take_profit_pct = 0.0025  # 0.25%
@@ -90,6 +227,14 @@ class TradingSystem:
         self.wallet = Wallet(initial_balance_usd)
         return True
         
+    def close(self):
+        """
+        Stop this system's background work before it is discarded (e.g. on reset): the
+        execution worker exits and signals still queued are dropped. The process-wide
+        forecaster keeps running for the other systems
+        """
+        self.execution_worker.stop()
+
     def save_system_state(self):
         """Save the current system state"""
         return self.state_manager.save_state(self.wallet)
@@ -131,6 +276,11 @@ class TradingSystem:
             
             # Add 24h price change percentage
             df['price_change_24h'] = ((df['close'] - df['close'].shift(24)) / df['close'].shift(24)) * 100
+
+            # Volume z-score against the last 20 candles (used by the pre-screener)
+            volume_mean = df['volume'].rolling(20).mean()
+            volume_std = df['volume'].rolling(20).std()
+            df['volume_z'] = (df['volume'] - volume_mean) / volume_std.where(volume_std > 0)
             
             return df.iloc[-1].to_dict()  # Return the most recent data point
             
@@ -143,58 +293,7 @@ class TradingSystem:
         Fetch market data for multiple symbols including major coins and meme tokens
         """
         if symbols is None:
-            # Major cryptocurrencies (verified on Binance)
-            major_coins = [
-                "BTCUSDT",  # Bitcoin
-                "ETHUSDT",  # Ethereum
-                "BNBUSDT",  # Binance Coin
-                "SOLUSDT",  # Solana
-                "ADAUSDT",  # Cardano
-                "XRPUSDT",  # XRP
-                "TRXUSDT",  # TRON
-                "LTCUSDT",  # Litecoin
-                "BCHUSDT",  # Bitcoin Cash
-                "DOTUSDT",  # Polkadot
-                "MATICUSDT", # Polygon
-                "AVAXUSDT", # Avalanche
-                "LINKUSDT", # Chainlink
-                "ATOMUSDT",  # Cosmos
-                "FILUSDT",   # Filecoin
-                "NEARUSDT",  # NEAR Protocol
-                "ARBUSDT",   # Arbitrum
-                "OPUSDT",    # Optimism
-                "SUIUSDT",   # Sui
-                "SEIUSDT",   # Sei
-                "RUNEUSDT"   # THORChain
-            ]
-            
-            # Meme coins and community tokens (verified on Binance)
-            meme_coins = [
-                "DOGEUSDT",  # Dogecoin
-                "SHIBUSDT",  # Shiba Inu
-                "PEPEUSDT",  # Pepe
-                "FLOKIUSDT", # Floki
-                "BONKUSDT",  # Bonk
-                "WIFUSDT",   # dogwifhat
-                "MEMEUSDT",  # Memecoin
-                "GMTUSDT",   # STEPN
-                "GALAUSDT",  # Gala Games
-                "APTUSDT",   # Aptos
-                "IMXUSDT",   # Immutable X
-                "MASKUSDT",  # Mask Network
-                "FETUSDT",   # Fetch.ai
-                "AGIXUSDT",  # SingularityNET
-                "ICPUSDT",   # Internet Computer
-                "JASMYUSDT", # JasmyCoin
-                "GMXUSDT",   # GMX
-                "CHZUSDT",   # Chiliz
-                "PERPUSDT",  # Perpetual Protocol
-                "STXUSDT",   # Stacks
-                "REEFUSDT",  # Reef
-                "TRUUSDT"    # TrueFi
-            ]
-            
-            symbols = major_coins + meme_coins
+            symbols = self.MAJOR_COINS + self.MEME_COINS
             
             # Verify symbols are valid on Binance
             valid_symbols = []
@@ -217,6 +316,19 @@ class TradingSystem:
         
         return market_data
 
+    def get_market_context(self, max_age=60):
+        """
+        Return the latest multi-pair MarketContext, refetching market data only when
+        the cached snapshot is older than max_age seconds
+        """
+        if self.market_context is not None and self.market_context.age() <= max_age:
+            return self.market_context
+        market_data = self.get_all_market_data()
+        if not market_data:
+            return None
+        self.market_context = MarketContext(market_data, multi_pair=True)
+        return self.market_context
+
     def save_all_market_data_csv(self, filepath='market_data.csv'):
         """Fetch all market data and append to a CSV snapshot (one row per symbol)."""
         try:
@@ -253,6 +365,9 @@ class TradingSystem:
                 df.to_csv(filepath, mode='a', header=False, index=False)
             else:
                 df.to_csv(filepath, index=False)
+            # Materialize the new rows for the forecaster as they arrive
+            if filepath == self.rl_forecast_agent.csv_path:
+                self.rl_forecast_agent.feature_store.refresh()
             return True
         except Exception as e:
             print(f"Error saving market data CSV: {e}")
@@ -278,124 +393,126 @@ class TradingSystem:
             
     def extract_trading_signals(self, analysis):
         """
-        Extract trading signals from agent analysis
+        Extract trading signals from agent analysis: the JSON signal blocks of the
+        trader's analysis and final plan, or the legacy free-text format as a fallback
         """
         trading_signals = []
         
         try:
-            # Parse trader's analysis for specific recommendations
-            trader_analysis = analysis.get("Trader's Analysis", "")
-            if isinstance(trader_analysis, str) and "Top Trading Opportunities" in trader_analysis:
-                for line in trader_analysis.split('\n'):
-                    if "Symbol:" in line:
-                        symbol = line.split("Symbol:")[1].strip()
-                    elif "Action:" in line:
-                        action = line.split("Action:")[1].strip().lower()
-                    elif "Entry Price:" in line:
-                        try:
-                            entry_price = float(line.split("Entry Price:")[1].strip().replace('$', ''))
-                            if all(v is not None for v in [symbol, action]):
-                                trading_signals.append({
-                                    'symbol': symbol,
-                                    'action': action,
-                                    'entry_price': entry_price
-                                })
-                        except (ValueError, AttributeError):
-                            continue
+            for section in ("Trader's Analysis", "Trader's Final Plan"):
+                text = analysis.get(section, "")
+                if isinstance(text, str):
+                    trading_signals.extend(parse_signals(text))
+            if not trading_signals:
+                trading_signals = self._extract_text_signals(analysis.get("Trader's Analysis", ""))
         except Exception as e:
             print(f"Error extracting trading signals: {e}")
             
         return trading_signals
 
-    def execute_autonomous_trades(self, trading_signals):
+    def _extract_text_signals(self, trader_analysis):
+        """Scrape "Symbol:/Action:/Entry Price:" lines from a free-text trader analysis"""
+        trading_signals = []
+        if isinstance(trader_analysis, str) and "Top Trading Opportunities" in trader_analysis:
+            symbol = action = None
+            for line in trader_analysis.split('\n'):
+                if "Symbol:" in line:
+                    symbol = line.split("Symbol:")[1].strip()
+                elif "Action:" in line:
+                    action = line.split("Action:")[1].strip().lower()
+                elif "Entry Price:" in line:
+                    try:
+                        entry_price = float(line.split("Entry Price:")[1].strip().replace('$', ''))
+                        if all(v is not None for v in [symbol, action]):
+                            trading_signals.append({
+                                'symbol': symbol,
+                                'action': action,
+                                'entry_price': entry_price
+                            })
+                    except (ValueError, AttributeError):
+                        continue
+        return trading_signals
+
+    def execute_signal(self, signal):
         """
-        Execute trades based on agent recommendations
+        Execute one trading signal now if the current price is within the entry price
+        tolerance. Returns True when a trade was placed
         """
-        for signal in trading_signals:
-            symbol = signal['symbol']
-            action = signal['action']
-            
-            # Get current price
-            ticker = self.client.get_symbol_ticker(symbol=symbol)
-            current_price = float(ticker['price'])
-            
-            # Check if price is within 1% of recommended entry
-            price_diff_pct = abs(current_price - signal['entry_price']) / signal['entry_price']
+        ticker = self.client.get_symbol_ticker(symbol=signal['symbol'])
+        current_price = float(ticker['price'])
+        
+        # Check if price is within tolerance (1% by default) of recommended entry
+        price_diff_pct = abs(current_price - signal['entry_price']) / signal['entry_price']
+        if price_diff_pct > self.entry_price_tolerance:
+            return False
+        return self.place_signal_order(signal, current_price)
+
+    def place_signal_order(self, signal, current_price):
+        """Size and place the order for a signal already checked against current_price"""
+        symbol = signal['symbol']
+        action = signal['action']
+
+        # Signals can be executed from several threads at once: size the order and reserve
+        # the symbol under the lock, but make the exchange calls without holding it
+        reserved_usd = 0.0
+        with self._trade_lock:
+            if symbol in self._orders_in_flight:
+                print(f"Skipping {action} signal for {symbol}: an order for it is already in flight")
+                return False
+            available_usd = self.wallet.current_balance_usd - self._reserved_usd
             
-            if price_diff_pct <= 0.01:  # Within 1% of recommended entry
-                available_usd = self.wallet.current_balance_usd
+            if action == 'buy' and available_usd >= 5:
+                # Use 10% of available balance or $5 minimum, whichever is larger (scalping)
+                trade_amount = reserved_usd = max(available_usd * 0.1, 5)
                 
-                if action == 'buy' and available_usd >= 5:
-                    # Use 10% of available balance or $5 minimum, whichever is larger (scalping)
-                    trade_amount = max(available_usd * 0.1, 5)
-                    self.execute_trade(symbol, action, trade_amount)
-                    
-                elif action == 'sell' and symbol in self.wallet.positions:
-                    # Sell 50% of the position
-                    position = self.wallet.positions[symbol]
-                    trade_amount = position['amount'] * current_price * 0.5
-                    self.execute_trade(symbol, action, trade_amount)
-
-    def analyze_market(self, symbol=None):
+            elif action == 'sell' and symbol in self.wallet.positions:
+                # Sell 50% of the position
+                position = self.wallet.positions[symbol]
+                trade_amount = position['amount'] * current_price * 0.5
+            else:
+                return False
+            self._orders_in_flight.add(symbol)
+            self._reserved_usd += reserved_usd
+
+        try:
+            # execute_trade fetches price and symbol info, then re-locks to check and commit
+            return bool(self.execute_trade(symbol, action, trade_amount))
+        finally:
+            with self._trade_lock:
+                self._orders_in_flight.discard(symbol)
+                self._reserved_usd -= reserved_usd
+
+    def submit_signal(self, signal):
+        """Hand a signal to the execution worker (or execute it inline when async execution is off)"""
+        if self.async_execution:
+            self.execution_worker.submit(signal)
+        else:
+            self.execute_signal(signal)
+
+    def wait_for_execution(self):
+        """Block until every queued signal has been filled or dropped"""
+        self.signal_bus.join()
+
+    def _signal_sink(self, context):
+        """
+        Per-cycle callback for signals parsed from the trader's stream: each (symbol, action)
+        is submitted for execution at most once per cycle, as soon as its JSON object closes.
+        The caller closes it when the cycle ends
+        """
+        return SignalSink(self.submit_signal, context.data)
+
+    def analyze_market(self, symbol=None, on_token=None, market_data=None):
         """
         Get analysis from all agents and make a trading decision
-        If symbol is None, analyze all pairs
+        If symbol is None, analyze all pairs (or only the pairs in a prefetched market_data dict)
+        If on_token is given, agent responses are streamed and every text delta is
+        reported as on_token(section_name, delta) while the cycle runs
         """
+        on_signal = None
         try:
-            def _format_prompt(agent, md, multi_pair_flag):
-                try:
-                    base = agent.system_message.content if hasattr(agent, 'system_message') and agent.system_message else ""
-                except Exception:
-                    base = ""
-                if not multi_pair_flag:
-                    formatted = {
-                        "price_data": {
-                            "close": float(md.get("close", 0)),
-                            "open": float(md.get("open", 0)),
-                            "high": float(md.get("high", 0)),
-                            "low": float(md.get("low", 0)),
-                            "volume": float(md.get("volume", 0)),
-                        },
-                        "indicators": {
-                            "RSI": float(md.get("RSI", 0)),
-                            "SMA_20": float(md.get("SMA_20", 0)),
-                            "SMA_50": float(md.get("SMA_50", 0)),
-                            "MACD": float(md.get("MACD", 0)),
-                            "MACD_SIGNAL": float(md.get("MACD_SIGNAL", 0)),
-                            "MACD_HIST": float(md.get("MACD_HIST", 0)),
-                            "price_change_24h": float(md.get("price_change_24h", 0)),
-                        },
-                    }
-                else:
-                    formatted = {}
-                    for sym, data in md.items():
-                        formatted[sym] = {
-                            "price_data": {
-                                "close": float(data.get("close", 0)),
-                                "open": float(data.get("open", 0)),
-                                "high": float(data.get("high", 0)),
-                                "low": float(data.get("low", 0)),
-                                "volume": float(data.get("volume", 0)),
-                            },
-                            "indicators": {
-                                "RSI": float(data.get("RSI", 0)),
-                                "SMA_20": float(data.get("SMA_20", 0)),
-                                "SMA_50": float(data.get("SMA_50", 0)),
-                                "MACD": float(data.get("MACD", 0)),
-                                "MACD_SIGNAL": float(data.get("MACD_SIGNAL", 0)),
-                                "MACD_HIST": float(data.get("MACD_HIST", 0)),
-                                "price_change_24h": float(data.get("price_change_24h", 0)),
-                            },
-                        }
-                import json as _json
-                return f"""
-{base}
+            # Whole cycle is bounded: analysts, consensus and final plan share this deadline
+            cycle_deadline = time.monotonic() + self.cycle_deadline_s
 
-Current Market Data:
-{_json.dumps(formatted, indent=2)}
-
-Provide your analysis based on this market data.
-"""
             # Get market data
             if symbol:
                 market_data = self.get_market_data(symbol)
@@ -403,96 +520,71 @@ Provide your analysis based on this market data.
                     return "Failed to fetch market data"
                 multi_pair = False
             else:
-                market_data = self.get_all_market_data()
+                if market_data is None:
+                    market_data = self.get_all_market_data()
+                    # The full fetched universe stays the latest snapshot for other readers
+                    # (a prefetched subset comes from poll_market_changes, which stored it)
+                    if market_data:
+                        self.market_context = MarketContext(market_data, multi_pair=True)
                 if not market_data:
                     return "Failed to fetch market data"
                 multi_pair = True
+
+            # Rank the universe and keep only the most active symbols for the agents
+            if multi_pair:
+                screened = self.screener.select(market_data, always_include=self.open_position_symbols())
+                if len(screened) < len(market_data):
+                    print(f"Screened {len(market_data)} symbols down to {len(screened)}: {', '.join(screened)}")
+                market_data = screened
+
+                # Reset the change detector baseline only for what the agents actually see, so a
+                # trigger on a screened-out symbol stays pending for the next cycle. Single-pair
+                # runs (pair view, /analysis/stream?symbol=) place no trades and leave it alone
+                self.change_detector.mark_analyzed(market_data, self.clock())
+
+            # Format the screened market data once per cycle; every agent shares the same context
+            context = MarketContext(market_data, multi_pair=multi_pair)
             
-            # Get analysis from each agent
-            analyses = {
-                # Core analyses
-                "Trader's Analysis": None,
-                "Risk Assessment": None,
-                "Technical Analysis": None,
-                "Financial Analysis": None,
-                # Specialized analyses
-                "Market Sentiment": None,
-                "Macro Environment": None,
-                "On-Chain Metrics": None,
-                "Liquidity Analysis": None,
-                "Correlation Analysis": None
-            }
-            
-            # Core analyses
-            try:
-                prompt = _format_prompt(self.trader, market_data, multi_pair)
-                analyses["Trader's Analysis"] = self.trader.get_response(prompt)
-            except Exception as e:
-                analyses["Trader's Analysis"] = f"Error: {str(e)}"
-                
-            try:
-                prompt = _format_prompt(self.risk_advisor, market_data, multi_pair)
-                analyses["Risk Assessment"] = self.risk_advisor.get_response(prompt)
-            except Exception as e:
-                analyses["Risk Assessment"] = f"Error: {str(e)}"
-                
-            try:
-                prompt = _format_prompt(self.graph_analyst, market_data, multi_pair)
-                analyses["Technical Analysis"] = self.graph_analyst.get_response(prompt)
-            except Exception as e:
-                analyses["Technical Analysis"] = f"Error: {str(e)}"
-                
-            try:
-                prompt = _format_prompt(self.financial_advisor, market_data, multi_pair)
-                analyses["Financial Analysis"] = self.financial_advisor.get_response(prompt)
-            except Exception as e:
-                analyses["Financial Analysis"] = f"Error: {str(e)}"
-                
-            # Specialized analyses
-            try:
-                prompt = _format_prompt(self.sentiment_analyst, market_data, multi_pair)
-                analyses["Market Sentiment"] = self.sentiment_analyst.get_response(prompt)
-            except Exception as e:
-                analyses["Market Sentiment"] = f"Error: {str(e)}"
-                
-            try:
-                prompt = _format_prompt(self.macro_analyst, market_data, multi_pair)
-                analyses["Macro Environment"] = self.macro_analyst.get_response(prompt)
-            except Exception as e:
-                analyses["Macro Environment"] = f"Error: {str(e)}"
-                
-            try:
-                prompt = _format_prompt(self.onchain_analyst, market_data, multi_pair)
-                analyses["On-Chain Metrics"] = self.onchain_analyst.get_response(prompt)
-            except Exception as e:
-                analyses["On-Chain Metrics"] = f"Error: {str(e)}"
-                
-            try:
-                prompt = _format_prompt(self.liquidity_analyst, market_data, multi_pair)
-                analyses["Liquidity Analysis"] = self.liquidity_analyst.get_response(prompt)
-            except Exception as e:
-                analyses["Liquidity Analysis"] = f"Error: {str(e)}"
-                
-            try:
-                prompt = _format_prompt(self.correlation_analyst, market_data, multi_pair)
-                analyses["Correlation Analysis"] = self.correlation_analyst.get_response(prompt)
-            except Exception as e:
-                analyses["Correlation Analysis"] = f"Error: {str(e)}"
+            # Trade signals are executed as the trader streams them (all-pairs mode only)
+            on_signal = self._signal_sink(context) if multi_pair else None
+
+            if multi_pair and self.sharded_analysis and len(context.symbols) > self.shard_max_symbols:
+                return self._analyze_sharded(context, market_data, cycle_deadline, on_signal, on_token)
+
+            def _stream_to(name):
+                return (lambda delta: on_token(name, delta)) if on_token else None
+
+            # Get analysis from each agent. The analysts are independent, so they
+            # are dispatched concurrently and consensus runs once a quorum is in.
+            analyses, prompt_tokens = self._run_analysts(
+                context, cycle_deadline - self.synthesis_budget_s, on_token, on_signal=on_signal)
+            self.last_prompt_tokens = dict(prompt_tokens)
+            print(f"Prompt tokens this cycle: ~{sum(prompt_tokens.values())} across {len(prompt_tokens)} analysts")
+            if analyses.missing:
+                print(f"Proceeding with partial consensus; missing: {', '.join(analyses.missing)}")
                 
-            # Get consensus view after collecting all analyses
-            try:
-                analyses["Consensus Summary"] = self.consensus_advisor.get_consensus(analyses)
-            except Exception as e:
-                analyses["Consensus Summary"] = f"Error generating consensus: {str(e)}"
+            # Get consensus view from whichever analyses completed, within the cycle deadline
+            missing = dict(analyses.missing)
+            analyses.update(run_concurrently(
+                {"Consensus Summary": lambda: self.consensus_advisor.get_consensus(
+                    dict(analyses), on_token=_stream_to("Consensus Summary"), missing=missing)},
+                deadline=cycle_deadline - self.synthesis_budget_s / 2,
+            ))
 
             # Pass the consensus summary back into the trader for a final plan
-            try:
-                consensus_text = analyses.get("Consensus Summary", "")
-                if isinstance(consensus_text, str):
-                    final_trader_plan = self.trader.get_trade_from_consensus(consensus_text, market_data, multi_pair)
-                    analyses["Trader's Final Plan"] = final_trader_plan
-            except Exception as e:
-                analyses["Trader's Final Plan"] = f"Error generating final plan: {str(e)}"
+            consensus_text = analyses.get("Consensus Summary", "")
+            if is_error(consensus_text):
+                analyses["Trader's Final Plan"] = "Error: skipped, consensus not available"
+            else:
+                plan_signals = on_signal.branch() if on_signal else None
+                analyses.update(run_concurrently(
+                    {"Trader's Final Plan": lambda: self.trader.get_trade_from_consensus(
+                        consensus_text, context, multi_pair,
+                        on_token=self._plan_stream(_stream_to("Trader's Final Plan"), plan_signals))},
+                    deadline=cycle_deadline,
+                ))
+                if plan_signals is not None:
+                    plan_signals.close()
 
             # RL Forecast agent analysis (uses CSV history if available)
             try:
@@ -500,23 +592,264 @@ Provide your analysis based on this market data.
             except Exception as e:
                 analyses["RL Forecast"] = f"Error in RL Forecast: {str(e)}"
             
-            # Extract and execute trades automatically if analyzing all pairs
+            # Submit any signals the stream did not deliver (e.g. a hedged or cached response)
             if multi_pair:
-                trading_signals = self.extract_trading_signals(analyses)
-                self.execute_autonomous_trades(trading_signals)
+                for sig in self.extract_trading_signals(analyses):
+                    on_signal(sig)
             
             return analyses
             
         except Exception as e:
             return f"Error in market analysis: {str(e)}"
+        finally:
+            # Streams abandoned by the fan-out may still be running; they must not trade any more
+            if on_signal is not None:
+                on_signal.close()
     
+    def _format_prompt(self, agent, ctx):
+        try:
+            base = agent.system_message.content if hasattr(agent, 'system_message') and agent.system_message else ""
+        except Exception:
+            base = ""
+        if not ctx.multi_pair:
+            table = ctx.table
+        else:
+            # Compact table, trimmed to this agent's token budget (open positions always kept)
+            budget = self.prompt_token_budgets.get(type(agent).__name__, self.prompt_token_budget)
+            table = ctx.budgeted_table(budget, base, always_include=self.open_position_symbols())
+        return f"""
+{base}
+
+Current Market Data (CSV):
+{table}
+
+Provide your analysis based on this market data.
+"""
+
+    def _run_analysts(self, context, deadline, on_token=None, label="", on_signal=None):
+        """
+        Fan the nine analysts out over one MarketContext and return (analyses, prompt_tokens).
+        label is appended to the section names passed to on_token (e.g. " [majors]").
+        on_signal receives each trade signal as soon as it closes in the trader's stream.
+        """
+        analysts = [
+            # Core analyses
+            ("Trader's Analysis", self.trader),
+            ("Risk Assessment", self.risk_advisor),
+            ("Technical Analysis", self.graph_analyst),
+            ("Financial Analysis", self.financial_advisor),
+            # Specialized analyses
+            ("Market Sentiment", self.sentiment_analyst),
+            ("Macro Environment", self.macro_analyst),
+            ("On-Chain Metrics", self.onchain_analyst),
+            ("Liquidity Analysis", self.liquidity_analyst),
+            ("Correlation Analysis", self.correlation_analyst),
+        ]
+        prompt_tokens = {}
+        trader_signals = on_signal.branch() if on_signal else None
+
+        def _ask(name, agent):
+            prompt = self._format_prompt(agent, context)
+            prompt_tokens[name + label] = estimate_tokens(prompt)
+            stream = (lambda delta: on_token(name + label, delta)) if on_token else None
+            if trader_signals is not None and agent is self.trader:
+                stream = tee_signals(stream, trader_signals)
+            return agent.respond(prompt, stream)
+
+        tasks = {name: (lambda name=name, agent=agent: _ask(name, agent)) for name, agent in analysts}
+        # Hedged duplicates skip the response cache so they really race the straggler
+        hedges = {
+            name: (lambda agent=agent: agent.get_response(self._format_prompt(agent, context), fresh=True))
+            for name, agent in analysts
+        }
+        analyses = run_concurrently(
+            tasks,
+            max_workers=self.agent_concurrency,
+            timeout={name: self.agent_latency_budgets.get(name, self.agent_timeout_s) for name, _ in analysts},
+            quorum=self.consensus_quorum,
+            deadline=deadline,
+            hedges=hedges if self.hedge_percentile else None,
+            hedge_after=self._hedge_delay,
+            latency=self.agent_latency,
+        )
+        if trader_signals is not None:
+            # A trader stream that timed out or lost to its hedge keeps running; drop its late signals
+            trader_signals.close()
+        return analyses, prompt_tokens
+
+    def symbol_shards(self, symbols):
+        """
+        Split symbols into named shards: majors, memes and anything else, each cut into
+        chunks of at most shard_max_symbols so prompt size stays flat as the universe grows
+        """
+        majors, memes = set(self.MAJOR_COINS), set(self.MEME_COINS)
+        groups = {
+            'majors': [s for s in symbols if s in majors],
+            'memes': [s for s in symbols if s in memes],
+            'other': [s for s in symbols if s not in majors and s not in memes],
+        }
+        size = max(1, self.shard_max_symbols)
+        shards = {}
+        for group, members in groups.items():
+            if not members:
+                continue
+            count = -(-len(members) // size)
+            # Spread members evenly instead of leaving a small remainder shard
+            per_shard = -(-len(members) // count)
+            for i in range(count):
+                name = group if count == 1 else f"{group} {i + 1}/{count}"
+                shards[name] = members[i * per_shard:(i + 1) * per_shard]
+        return shards
+
+    def _analyze_sharded(self, context, market_data, cycle_deadline, on_signal, on_token=None):
+        """
+        Map-reduce analysis of a large universe. Map: every shard runs the analysts and
+        a compact shard consensus in parallel. Reduce: the shard summaries are merged
+        into one consensus and the trader writes the final plan from it.
+        """
+        shards = self.symbol_shards(context.symbols)
+
+        def _stream_to(name):
+            return (lambda delta: on_token(name, delta)) if on_token else None
+
+        def _map(shard):
+            label = f" [{shard}]"
+            shard_context = context.subset(shards[shard])
+            analyses, prompt_tokens = self._run_analysts(
+                shard_context, cycle_deadline - self.synthesis_budget_s, on_token, label, on_signal)
+            summary = run_concurrently(
+                {"summary": lambda: self.consensus_advisor.get_consensus(
+                    dict(analyses), on_token=_stream_to("Shard Summary" + label),
+                    missing=dict(analyses.missing), compact=True)},
+                deadline=cycle_deadline - self.synthesis_budget_s / 2,
+            )["summary"]
+            return analyses, prompt_tokens, summary
+
+        shard_results = run_concurrently(
+            {shard: (lambda shard=shard: _map(shard)) for shard in shards},
+            max_workers=self.shard_concurrency,
+            deadline=cycle_deadline - self.synthesis_budget_s / 2,
+        )
+
+        # Merge each analyst's per-shard output into one section so consumers see the usual keys
+        analyses = AgentResults()
+        summaries, missing_shards, prompt_tokens = {}, {}, {}
+        for shard, result in shard_results.items():
+            if shard in shard_results.missing or not isinstance(result, tuple):
+                missing_shards[shard] = shard_results.missing.get(shard, str(result))
+                continue
+            shard_analyses, shard_tokens, summary = result
+            prompt_tokens.update(shard_tokens)
+            for name, text in shard_analyses.items():
+                section = f"[{shard}]\n{text}"
+                analyses[name] = f"{analyses[name]}\n\n{section}" if name in analyses else section
+                if name in shard_analyses.missing:
+                    analyses.missing[f"{name} [{shard}]"] = shard_analyses.missing[name]
+            if is_error(summary):
+                missing_shards[shard] = summary
+            else:
+                summaries[shard] = summary
+                analyses[f"Shard Summary [{shard}]"] = summary
+        self.last_prompt_tokens = dict(prompt_tokens)
+        print(f"Sharded analysis: {len(shards)} shards, prompt tokens ~{sum(prompt_tokens.values())} "
+              f"across {len(prompt_tokens)} analyst calls")
+        if analyses.missing or missing_shards:
+            print(f"Proceeding with partial consensus; missing: {', '.join(list(analyses.missing) + list(missing_shards))}")
+
+        if summaries:
+            analyses.update(run_concurrently(
+                {"Consensus Summary": lambda: self.consensus_advisor.reduce_shards(
+                    summaries, on_token=_stream_to("Consensus Summary"), missing=missing_shards)},
+                deadline=cycle_deadline - self.synthesis_budget_s / 4,
+            ))
+        else:
+            analyses["Consensus Summary"] = "Error: no shard produced a summary"
+
+        consensus_text = analyses.get("Consensus Summary", "")
+        if is_error(consensus_text):
+            analyses["Trader's Final Plan"] = "Error: skipped, consensus not available"
+        else:
+            plan_signals = on_signal.branch()
+            analyses.update(run_concurrently(
+                {"Trader's Final Plan": lambda: self.trader.get_trade_from_consensus(
+                    consensus_text, context, True,
+                    on_token=self._plan_stream(_stream_to("Trader's Final Plan"), plan_signals))},
+                deadline=cycle_deadline,
+            ))
+            plan_signals.close()
+
+        try:
+            analyses["RL Forecast"] = self.rl_forecast_agent.get_response(market_data, True)
+        except Exception as e:
+            analyses["RL Forecast"] = f"Error in RL Forecast: {str(e)}"
+
+        for sig in self.extract_trading_signals(analyses):
+            on_signal(sig)
+        return analyses
+
+    def _plan_stream(self, on_token, on_signal):
+        """Stream callback for a trader call: forwards deltas and parses signals when on_signal is set"""
+        return tee_signals(on_token, on_signal) if on_signal else on_token
+
+    def poll_market_changes(self):
+        """
+        Fetch market data and return (market_data, changes) restricted to the symbols
+        whose indicators moved materially since their last analysis (or whose heartbeat
+        is due). Both are empty when nothing changed.
+        """
+        market_data = self.get_all_market_data()
+        if not market_data:
+            return {}, {}
+        self.market_context = MarketContext(market_data, multi_pair=True)
+        changes = self.change_detector.detect(market_data, self.clock())
+        return {symbol: market_data[symbol] for symbol in changes}, changes
+
+    def analyze_if_changed(self, on_token=None):
+        """
+        Change-triggered analysis: run the agents only for symbols that changed.
+        Returns (analyses or None, changes); on_token is passed to analyze_market
+        """
+        market_data, changes = self.poll_market_changes()
+        if not changes:
+            return None, {}
+        print(f"Analyzing {len(changes)} changed symbols: {', '.join(changes)}")
+        return self.analyze_market(market_data=market_data, on_token=on_token), changes
+
+    def _hedge_delay(self, name):
+        """Seconds after which a straggling agent gets a hedged duplicate (None = not yet)"""
+        delay = self.agent_latency.percentile(name, self.hedge_percentile)
+        return None if delay is None else max(delay, self.hedge_min_delay_s)
+
+    def stream_market_analysis(self, symbol=None, market_data=None):
+        """
+        Run analyze_market on a worker thread and yield (section_name, text_delta)
+        events as tokens arrive. The final event is (None, analyses) carrying the
+        aggregated result exactly as analyze_market returns it.
+        """
+        events = queue.Queue()
+
+        def worker():
+            try:
+                result = self.analyze_market(symbol, on_token=lambda name, delta: events.put((name, delta)),
+                                             market_data=market_data)
+            except Exception as e:
+                result = f"Error in market analysis: {str(e)}"
+            events.put((None, result))
+
+        threading.Thread(target=worker, name="analysis-stream", daemon=True).start()
+        while True:
+            name, payload = events.get()
+            yield name, payload
+            if name is None:
+                return
+
     def manage_open_positions(self):
         """
         Scalping manager: close positions quickly for micro-profits or small losses.
         Sells 100% of position when thresholds are met.
         """
         try:
-            symbols = list(self.wallet.positions.keys())
+            symbols = self.open_position_symbols()
             for symbol in symbols:
                 try:
                     pos = self.wallet.positions.get(symbol)
@@ -580,41 +913,43 @@ Provide your analysis based on this market data.
             if trade_value < min_notional:
                 raise Exception(f"Order value ${trade_value:.2f} below minimum ${min_notional:.2f} for {symbol}")
             
-            # Check if we can execute the virtual trade
-            can_trade, error_msg = self.wallet.can_execute_trade(symbol, side, trade_value)
-            if not can_trade:
-                raise Exception(error_msg or f"Insufficient virtual funds for {side} trade of ${trade_value:.2f}")
+            # Check and update the wallet atomically: API requests, the execution worker and
+            # the analysis cycle can all trade from different threads
+            with self._trade_lock:
+                # Check if we can execute the virtual trade
+                can_trade, error_msg = self.wallet.can_execute_trade(symbol, side, trade_value)
+                if not can_trade:
+                    raise Exception(error_msg or f"Insufficient virtual funds for {side} trade of ${trade_value:.2f}")
             
-            # Create virtual order with realistic execution
-            import time
-            order = {
-                'symbol': symbol,
-                'side': side.upper(),
-                'status': 'FILLED',
-                'executedQty': str(quantity),
-                'fills': [{'price': str(execution_price)}],
-                'transactTime': int(time.time() * 1000),
-                'type': 'VIRTUAL',
-                'fees': fees_usd,
-                'slippage': slippage_factor
-            }
-            
-            # Update virtual wallet with fees
-            self.wallet.update_after_trade(
-                symbol=symbol,
-                side=side,
-                amount=float(order['executedQty']),
-                price=float(order['fills'][0]['price']),
-                timestamp=order['transactTime'],
-                fees_usd=fees_usd
-            )
-            
-            print(f"Virtual {side.upper()} order executed: {quantity} {symbol} @ ${execution_price:.4f} (fees: ${fees_usd:.2f}, slippage: {slippage_factor:.4f})")
-            
-            # Save system state after successful trade
-            self.save_system_state()
-            
-            return order
+                # Create virtual order with realistic execution
+                order = {
+                    'symbol': symbol,
+                    'side': side.upper(),
+                    'status': 'FILLED',
+                    'executedQty': str(quantity),
+                    'fills': [{'price': str(execution_price)}],
+                    'transactTime': int(self.clock() * 1000),
+                    'type': 'VIRTUAL',
+                    'fees': fees_usd,
+                    'slippage': slippage_factor
+                }
+            
+                # Update virtual wallet with fees
+                self.wallet.update_after_trade(
+                    symbol=symbol,
+                    side=side,
+                    amount=float(order['executedQty']),
+                    price=float(order['fills'][0]['price']),
+                    timestamp=order['transactTime'],
+                    fees_usd=fees_usd
+                )
+            
+                print(f"Virtual {side.upper()} order executed: {quantity} {symbol} @ ${execution_price:.4f} (fees: ${fees_usd:.2f}, slippage: {slippage_factor:.4f})")
+            
+                # Save system state after successful trade
+                self.save_system_state()
+            
+                return order
             
         except BinanceAPIException as e:
             print(f"Error executing trade: {e}")
@@ -629,13 +964,21 @@ Provide your analysis based on this market data.
         """
         # Get current prices for all positions
         price_dict = {}
-        for symbol in self.wallet.positions.keys():
+        for symbol in self.open_position_symbols():
             try:
                 ticker = self.client.get_symbol_ticker(symbol=symbol)
                 price_dict[symbol] = float(ticker['price'])
             except BinanceAPIException:
                 price_dict[symbol] = 0.0
         
-        summary = self.wallet.get_portfolio_summary()
-        summary['total_value'] = self.wallet.get_total_value(price_dict)
+        # Positions change on the execution worker; summarize a consistent copy
+        with self._trade_lock:
+            summary = self.wallet.get_portfolio_summary()
+            summary['positions'] = {symbol: dict(pos) for symbol, pos in self.wallet.positions.items()}
+            summary['total_value'] = self.wallet.get_total_value(price_dict)
         return summary
+
+    def open_position_symbols(self):
+        """Snapshot of the symbols with open positions (the execution worker updates them concurrently)"""
+        with self._trade_lock:
+            return list(self.wallet.positions)